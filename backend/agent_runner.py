@@ -14,7 +14,7 @@ from typing import Any
 from agents import get_agent_by_id
 from challenges import get_challenge_by_id
 from agent_turn import complete_agent_session, execute_prompt_turn
-from llm import LLM
+from llm import LLM, estimate_tokens
 from evaluation.evaluator import ChallengeEvaluator
 from evaluation.test_generator import TestGenerator
 from sessions import get_session, add_turn, append_trace, Turn
@@ -211,7 +211,7 @@ async def _run_agent_loop_claude_sdk(
     if not session or not challenge or session.status != "active":
         return
 
-    t0 = time.time()
+    t0 = time.monotonic()
     _trace(session_id, "Starting Claude Agent SDK", t0)
 
     @tool(
@@ -448,7 +448,7 @@ async def _run_agent_loop_claude_sdk(
 
 
 def _trace(session_id: str, step: str, t0: float, **kwargs: Any) -> None:
-    elapsed_ms = int((time.time() - t0) * 1000)
+    elapsed_ms = int((time.monotonic() - t0) * 1000)
     extra = " ".join(f"{k}={v}" for k, v in kwargs.items())
     logger.info("[agent_trace] session_id=%s %s (+%dms) %s", session_id[:8], step, elapsed_ms, extra or "")
     session = get_session(session_id)
@@ -510,7 +510,7 @@ async def run_agent_loop(session_id: str, challenge_id: str, agent_id: str) -> N
     )
     # #endregion
 
-    t0 = time.time()
+    t0 = time.monotonic()
     _trace(session_id, "Starting run", t0, challenge_id=challenge_id, agent_id=agent_id)
 
     session = get_session(session_id)
@@ -609,7 +609,7 @@ async def run_agent_loop(session_id: str, challenge_id: str, agent_id: str) -> N
 
             # --- LLM call: pause timer during latency (before first token) ---
             await broadcast_session_event(session_id, {"type": "timer_paused"})
-            llm_start = time.time()
+            llm_start = time.monotonic()
             first_token_time: float | None = None
             async for chunk in llm.stream(
                 prompt,
@@ -618,7 +618,7 @@ async def run_agent_loop(session_id: str, challenge_id: str, agent_id: str) -> N
                 max_tokens=max_tok,
             ):
                 if first_token_time is None:
-                    first_token_time = time.time()
+                    first_token_time = time.monotonic()
                     # Latency period over — accumulate and resume timer
                     latency = first_token_time - llm_start
                     _s = get_session(session_id)
@@ -637,7 +637,7 @@ async def run_agent_loop(session_id: str, challenge_id: str, agent_id: str) -> N
                 )
             # Edge case: no tokens received at all (empty response)
             if first_token_time is None:
-                latency = time.time() - llm_start
+                latency = time.monotonic() - llm_start
                 _s = get_session(session_id)
                 if _s:
                     _s.paused_seconds += latency
@@ -647,8 +647,8 @@ async def run_agent_loop(session_id: str, challenge_id: str, agent_id: str) -> N
                 })
 
             generated_code = LLM.extract_code_blocks(full_response)
-            est_prompt_tokens = len(prompt.split()) * 2
-            est_response_tokens = len(full_response.split()) * 2
+            est_prompt_tokens = estimate_tokens(prompt)
+            est_response_tokens = estimate_tokens(full_response)
             _trace(session_id, "Model responded", t0, response_tokens=est_response_tokens)
 
             # Check for DONE signal BEFORE evaluating — don't waste time evaluating
@@ -662,7 +662,7 @@ async def run_agent_loop(session_id: str, challenge_id: str, agent_id: str) -> N
 
             # --- Evaluation: pause timer during eval overhead ---
             await broadcast_session_event(session_id, {"type": "timer_paused"})
-            eval_start = time.time()
+            eval_start = time.monotonic()
             _eval = _get_evaluator()
             _tgen = _get_test_generator()
             _gen_suite = None
@@ -670,7 +670,7 @@ async def run_agent_loop(session_id: str, challenge_id: str, agent_id: str) -> N
                 _gen_suite = await _tgen.generate_tests(challenge)
             _eval_result = await _eval.evaluate(challenge, generated_code, _gen_suite)
             accuracy = _eval_result.accuracy
-            eval_elapsed = time.time() - eval_start
+            eval_elapsed = time.monotonic() - eval_start
             _s2 = get_session(session_id)
             if _s2:
                 _s2.paused_seconds += eval_elapsed
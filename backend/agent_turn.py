@@ -7,7 +7,7 @@ import time
 from collections.abc import Awaitable, Callable
 
 from challenges import get_challenge_by_id
-from llm import LLM, REPLICATE_UI_SYSTEM_PROMPT
+from llm import LLM, REPLICATE_UI_SYSTEM_PROMPT, estimate_tokens
 from evaluation.scoring import compute_composite_score
 from evaluation.evaluator import ChallengeEvaluator
 from evaluation.test_generator import TestGenerator
@@ -120,8 +120,8 @@ async def execute_prompt_turn(
         test_results = eval_result.test_results
         _log.info("Evaluator result: accuracy=%.2f, details=%s", accuracy, eval_result.details)
 
-        est_prompt_tokens = len(prompt.split()) * 2
-        est_response_tokens = len(full_response.split()) * 2
+        est_prompt_tokens = estimate_tokens(prompt)
+        est_response_tokens = estimate_tokens(full_response)
 
         from config import compute_cost
         turn_cost = compute_cost(model, est_prompt_tokens, est_response_tokens)
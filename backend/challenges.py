@@ -50,6 +50,7 @@ class Challenge(BaseModel):
 # ---------------------------------------------------------------------------
 
 import json
+from functools import lru_cache
 from pathlib import Path
 import logging
 
@@ -73,12 +74,27 @@ def load_challenges_from_json() -> list[Challenge]:
 # Load once at startup
 ALL_CHALLENGES = load_challenges_from_json()
 
+# id -> challenge; the first definition wins if an id is duplicated in the JSON.
+_CHALLENGES_BY_ID: dict[str, Challenge] = {}
+for _c in ALL_CHALLENGES:
+    _CHALLENGES_BY_ID.setdefault(_c.id, _c)
+
 def get_all_challenges() -> list[Challenge]:
     return ALL_CHALLENGES
 
 
 def get_challenge_by_id(challenge_id: str) -> Challenge | None:
-    for c in ALL_CHALLENGES:
-        if c.id == challenge_id:
-            return c
-    return None
\ No newline at end of file
+    return _CHALLENGES_BY_ID.get(challenge_id)
+
+
+@lru_cache(maxsize=256)
+def get_test_suite_dicts(challenge_id: str) -> tuple[dict, ...]:
+    """Return the built-in challenge's test suite as plain dicts, dumped once.
+
+    Built-in challenges are static, so the ``model_dump()`` result is cached per
+    id and shared between callers — treat the returned dicts as read-only.
+    """
+    challenge = get_challenge_by_id(challenge_id)
+    if challenge is None or not challenge.test_suite:
+        return ()
+    return tuple(t.model_dump() for t in challenge.test_suite)
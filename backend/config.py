@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from pydantic import field_validator
 from pydantic_settings import BaseSettings
 from slowapi import Limiter
@@ -27,6 +29,20 @@ class Settings(BaseSettings):
     perplexity_api_key: str = ""
     perplexity_base_url: str = "https://api.perplexity.ai"
 
+    # Reuse chat responses for byte-identical product-challenge conversations
+    # (unscored chats only) for this many seconds. 0 disables the cache.
+    product_response_cache_seconds: int = 0
+    # Reuse /api/evaluate-ui judge scores for identical submissions this long.
+    ui_evaluation_cache_seconds: int = 3600
+    # Reuse Perplexity research for a problem statement this long.
+    research_cache_seconds: int = 86400
+    # Token budget for the reference + submitted HTML in the evaluate-ui judge
+    # prompt; the reference is kept whole and the submission trimmed beyond it.
+    ui_evaluation_max_html_tokens: int = 12000
+    # Concurrent judge calls from evaluate-ui and prompt-feedback per process;
+    # further requests queue instead of piling onto the provider.
+    max_concurrent_judge_calls: int = 16
+
     # Server configuration
     host: str = "0.0.0.0"
     port: int = 8000
@@ -122,10 +138,30 @@ MODEL_PRICING = {
     "sonar-pro": {"input": 3.0, "output": 15.0},
 }
 
+# Anthropic prompt caching: cache writes bill at 1.25x and cache reads at 0.1x
+# the model's base input rate.
+CACHE_WRITE_MULTIPLIER = 1.25
+CACHE_READ_MULTIPLIER = 0.1
+
 # Default pricing for unknown models (use GPT-5.2 rates)
 _DEFAULT_PRICING = {"input": 1.75, "output": 14.0}
 
 
+@lru_cache(maxsize=256)
+def resolve_pricing(model: str) -> tuple[float, float] | None:
+    """(input, output) rates per 1M tokens for *model*.
+
+    Falls back to the first MODEL_PRICING key that *model* starts with (e.g.
+    a dated model ID); returns None if nothing matches.
+    """
+    pricing = MODEL_PRICING.get(model)
+    if pricing is None:
+        pricing = next((p for key, p in MODEL_PRICING.items() if model.startswith(key)), None)
+    if pricing is None:
+        return None
+    return pricing["input"], pricing["output"]
+
+
 def compute_cost(model: str, prompt_tokens: int, response_tokens: int) -> float:
     """Compute dollar cost from token counts and model pricing (per 1M tokens)."""
     pricing = MODEL_PRICING.get(model, _DEFAULT_PRICING)
@@ -14,7 +14,6 @@ if str(Path(__file__).parent.parent) not in sys.path:
 from challenges import Challenge, TestCase
 from modal_execution import ModalExecutor, ExecutionType
 from .test_generator import GeneratedTestSuite
-from integrations.github_runner import run_in_repo_context
 from integrations import store
 from llm import run_function_tests_local
 
@@ -255,6 +254,8 @@ class ChallengeEvaluator:
                 details={"error": "github_token_missing"},
             )
 
+        from integrations.github_runner import run_in_repo_context
+
         results, pytest_stdout = await run_in_repo_context(
             github_token,
             challenge.repo_context,
@@ -11,6 +11,9 @@ All sub-scores are on a 0-1000 scale; the composite is also 0-1000.
 
 import math
 import sys
+from collections import Counter
+from collections.abc import Sequence
+from functools import lru_cache
 from pathlib import Path
 
 # Add parent directory to path for absolute imports
@@ -32,12 +35,20 @@ def compute_accuracy_text(generated: str, target: str) -> float:
     if not target:
         return 0.0
     # Normalize whitespace for comparison
-    gen_tokens = generated.split()
-    tgt_tokens = target.split()
-    if not tgt_tokens:
+    tgt_counts, tgt_total = _target_token_counts(target)
+    if not tgt_total:
         return 0.0
-    common = len(set(gen_tokens) & set(tgt_tokens))
-    return common / max(len(tgt_tokens), 1)
+    # Multiset overlap: a token repeated in the target counts once per copy
+    # the generated text also has, so an exact match scores 1.0.
+    common = (Counter(generated.split()) & tgt_counts).total()
+    return common / tgt_total
+
+
+@lru_cache(maxsize=256)
+def _target_token_counts(target: str) -> tuple[Counter, int]:
+    """Token counts and total for a challenge target, which is scored against repeatedly."""
+    counts = Counter(target.split())
+    return counts, counts.total()
 
 
 def calculate_prompt_score(accuracy, time_seconds, cost_dollars, num_turns, base_rating=500):
@@ -332,7 +343,7 @@ def compute_prd_composite_score(
     }
 
 
-async def run_function_tests(sandbox_id: str, code: str, test_suite: list[dict]) -> list[bool]:
+async def run_function_tests(sandbox_id: str, code: str, test_suite: Sequence[dict]) -> list[bool]:
     """
     Run test cases via a persistent Modal sandbox. Returns list of booleans.
     """
@@ -341,7 +352,7 @@ async def run_function_tests(sandbox_id: str, code: str, test_suite: list[dict])
     return [r["passed"] for r in detailed]
 
 
-async def run_function_tests_detailed(sandbox_id: str, code: str, test_suite: list[dict]) -> list[dict]:
+async def run_function_tests_detailed(sandbox_id: str, code: str, test_suite: Sequence[dict]) -> list[dict]:
     """
     Run test cases via a persistent Modal sandbox. Returns detailed results.
     """
@@ -13,7 +13,7 @@ if str(Path(__file__).parent.parent) not in sys.path:
     sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from challenges import Challenge, TestCase
-from llm import LLM, LLMResponse
+from llm import LLM, LLMResponse, get_shared_http_client
 from config import settings
 
 
@@ -48,53 +48,54 @@ class AnthropicLLM:
         conversation_history: list[dict] | None = None,
     ) -> LLMResponse:
         """Generate a response using Anthropic's API."""
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            headers = {
-                "x-api-key": self.api_key,
-                "anthropic-version": "2023-06-01",
-                "content-type": "application/json",
-            }
-            
-            # Build messages
-            messages = []
-            if conversation_history:
-                messages.extend(conversation_history)
-            messages.append({"role": "user", "content": prompt})
-            
-            payload = {
-                "model": model or self.model,
-                "max_tokens": max_tokens or self.max_tokens,
-                "messages": messages,
-                "system": system_prompt or self.system_prompt,
-                "temperature": temperature if temperature is not None else self.temperature,
-            }
-            
-            response = await client.post(
-                "https://api.anthropic.com/v1/messages",
-                headers=headers,
-                json=payload,
-            )
-            
-            if response.status_code != 200:
-                error_text = response.text
-                raise Exception(f"Anthropic API error ({response.status_code}): {error_text}")
-            
-            data = response.json()
-            content = data.get("content", [])
-            response_text = ""
-            for block in content:
-                if block.get("type") == "text":
-                    response_text += block.get("text", "")
-            
-            usage = data.get("usage", {})
-            
-            return LLMResponse(
-                response_text=response_text,
-                generated_code=LLM.extract_code_blocks(response_text),
-                prompt_tokens=usage.get("input_tokens", 0),
-                response_tokens=usage.get("output_tokens", 0),
-                model=data.get("model", self.model),
-            )
+        client = get_shared_http_client()
+        headers = {
+            "x-api-key": self.api_key,
+            "anthropic-version": "2023-06-01",
+            "content-type": "application/json",
+        }
+        
+        # Build messages
+        messages = []
+        if conversation_history:
+            messages.extend(conversation_history)
+        messages.append({"role": "user", "content": prompt})
+        
+        payload = {
+            "model": model or self.model,
+            "max_tokens": max_tokens or self.max_tokens,
+            "messages": messages,
+            "system": system_prompt or self.system_prompt,
+            "temperature": temperature if temperature is not None else self.temperature,
+        }
+        
+        response = await client.post(
+            "https://api.anthropic.com/v1/messages",
+            headers=headers,
+            json=payload,
+            timeout=httpx.Timeout(60.0, connect=10.0),
+        )
+        
+        if response.status_code != 200:
+            error_text = response.text
+            raise Exception(f"Anthropic API error ({response.status_code}): {error_text}")
+        
+        data = response.json()
+        content = data.get("content", [])
+        response_text = ""
+        for block in content:
+            if block.get("type") == "text":
+                response_text += block.get("text", "")
+        
+        usage = data.get("usage", {})
+        
+        return LLMResponse(
+            response_text=response_text,
+            generated_code=LLM.extract_code_blocks(response_text),
+            prompt_tokens=usage.get("input_tokens", 0),
+            response_tokens=usage.get("output_tokens", 0),
+            model=data.get("model", self.model),
+        )
 
 
 def create_claude_llm() -> LLM | AnthropicLLM:
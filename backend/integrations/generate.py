@@ -6,11 +6,11 @@ import re
 
 from llm import LLM
 from config import settings
-from integrations.github_runner import discover_pr_fixed_tests
 from integrations.store import get_integration
 
 logger = logging.getLogger(__name__)
 
+
 _PARSE_SYSTEM = """You are a test case extractor. Given Python test code, extract each test assertion as a JSON array of objects with keys "input" and "expected_output".
 - "input" must be a Python expression that calls the function under test (e.g. `foo(1, 2)`)
 - "expected_output" must be a Python literal of the expected return value (e.g. `[1, 2]`, `"hello"`, `42`, `None`)
@@ -117,6 +117,8 @@ async def build_challenge_from_issue(
         challenge_test_ids: list[str] = []
         if github_token:
             try:
+                from integrations.github_runner import discover_pr_fixed_tests
+
                 challenge_test_ids = await discover_pr_fixed_tests(
                     github_token, pr_owner, pr_repo, base_sha, head_sha, test_files
                 )
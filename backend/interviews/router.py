@@ -1,7 +1,6 @@
 """FastAPI router for Interview mode endpoints."""
 
 import asyncio
-import json
 import logging
 import time
 
@@ -11,6 +10,7 @@ from fastapi.responses import StreamingResponse
 from config import settings, MODEL_PRICING, limiter
 from evaluation import compute_composite_score
 from llm import LLM
+from sse import SSE_PING_FRAME, sse_chunk_frame, sse_error_frame, sse_frame
 
 from .models import (
     CreateRoomRequest,
@@ -279,7 +279,7 @@ async def submit_prompt(room_id: str, session_id: str, req: SubmitPromptRequest,
                 temperature=temperature,
             ):
                 full_response += chunk
-                yield f"data: {json.dumps({'type': 'chunk', 'content': chunk})}\n\n"
+                yield sse_chunk_frame(chunk)
 
                 # Broadcast chunk to observers
                 await realtime.broadcast(room_id, {
@@ -310,7 +310,7 @@ async def submit_prompt(room_id: str, session_id: str, req: SubmitPromptRequest,
             elif not challenge.test_suite and not challenge.repo_context:
                 logger.info("[auto-eval] SKIP: no test_suite and no repo_context")
             elif challenge.repo_context:
-                yield f"data: {json.dumps({'type': 'evaluating'})}\n\n"
+                yield sse_frame({'type': 'evaluating'})
                 try:
                     from challenges import RepoContext
                     from integrations.github_runner import run_in_repo_context
@@ -349,7 +349,7 @@ async def submit_prompt(room_id: str, session_id: str, req: SubmitPromptRequest,
                 except Exception:
                     logger.exception("Repo-context auto-eval failed for session %s", session_id)
             else:
-                yield f"data: {json.dumps({'type': 'evaluating'})}\n\n"
+                yield sse_frame({'type': 'evaluating'})
                 sandbox_id = None
                 try:
                     from sandbox import create_sandbox, terminate_sandbox
@@ -409,11 +409,11 @@ async def submit_prompt(room_id: str, session_id: str, req: SubmitPromptRequest,
                 "timestamp": time.time(),
             })
 
-            yield f"data: {json.dumps({'type': 'done', 'content': full_response, 'generated_code': generated_code, 'input_tokens': est_prompt_tokens, 'output_tokens': est_response_tokens, 'cost': cost, 'total_tokens': _total_tokens, 'total_turns': _total_turns, 'accuracy': accuracy, 'test_results': test_results})}\n\n"
+            yield sse_frame({'type': 'done', 'content': full_response, 'generated_code': generated_code, 'input_tokens': est_prompt_tokens, 'output_tokens': est_response_tokens, 'cost': cost, 'total_tokens': _total_tokens, 'total_turns': _total_turns, 'accuracy': accuracy, 'test_results': test_results})
 
         except Exception as e:
             logger.error("Interview prompt streaming error: %s", e)
-            yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+            yield sse_error_frame(str(e))
 
     return StreamingResponse(
         generate(),
@@ -580,9 +580,9 @@ async def observe_room(room_id: str):
             while True:
                 try:
                     event = await asyncio.wait_for(queue.get(), timeout=30.0)
-                    yield f"data: {json.dumps(event)}\n\n"
+                    yield sse_frame(event)
                 except asyncio.TimeoutError:
-                    yield f"data: {json.dumps({'type': 'ping'})}\n\n"
+                    yield SSE_PING_FRAME
         except asyncio.CancelledError:
             pass
         finally:
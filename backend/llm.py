@@ -3,14 +3,61 @@ import re
 import logging
 from dataclasses import dataclass, field
 from collections.abc import AsyncGenerator
+from functools import lru_cache
 
+import httpx
 from openai import AsyncOpenAI
 
 from config import settings
+from sandbox import TEST_HELPERS_SOURCE
 
 _log = logging.getLogger(__name__)
 
 
+# ---------------------------------------------------------------------------
+# Shared HTTP connection pool
+# ---------------------------------------------------------------------------
+
+# One pooled HTTP/2 client for every LLM instance in the process, so judge,
+# feedback and chat calls reuse warm TLS connections to the provider instead
+# of handshaking on each request. Created lazily on first use and closed from
+# the FastAPI lifespan.
+_shared_http_client: httpx.AsyncClient | None = None
+
+
+def get_shared_http_client() -> httpx.AsyncClient:
+    """Return the process-wide pooled ``httpx.AsyncClient`` (created on first call)."""
+    global _shared_http_client
+    if _shared_http_client is None or _shared_http_client.is_closed:
+        _shared_http_client = httpx.AsyncClient(
+            http2=True,
+            # Generous read timeout: non-streaming completions with large
+            # max_tokens can legitimately take minutes.
+            timeout=httpx.Timeout(600.0, connect=10.0),
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=100),
+        )
+    return _shared_http_client
+
+
+async def close_shared_http_client() -> None:
+    """Close the shared pool (called on application shutdown)."""
+    global _shared_http_client
+    if _shared_http_client is not None:
+        await _shared_http_client.aclose()
+        _shared_http_client = None
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token) for streamed text
+    where the provider doesn't report usage.
+
+    Only reads the length, so long aborted responses cost nothing to measure.
+    """
+    if not text:
+        return 0
+    return max(1, len(text) >> 2)
+
+
 # ---------------------------------------------------------------------------
 # AST-based code filtering utilities
 # ---------------------------------------------------------------------------
@@ -111,6 +158,22 @@ def extract_python_via_ast(text: str) -> str:
     return ""
 
 
+# Same helpers the sandbox runner provides; compiled and defined once; each
+# run starts from a copy.
+_TEST_HELPERS: dict = {}
+exec(compile(TEST_HELPERS_SOURCE, "<lucidly-helpers>", "exec"), _TEST_HELPERS)
+
+
+@lru_cache(maxsize=4096)
+def _compiled(source: str, mode: str):
+    """Code object for *source*, compiled once.
+
+    Solutions are often re-scored unchanged, and test inputs and expected
+    outputs repeat across every evaluation of a challenge.
+    """
+    return compile(source, "<string>", mode)
+
+
 def run_function_tests_local(code: str, test_suite: list[dict]) -> tuple[float, list[bool]]:
     """Execute Python *code* (typically function definitions) and evaluate it
     against *test_suite* (list of ``{input, expected_output}`` dicts) **in-process**.
@@ -125,13 +188,13 @@ def run_function_tests_local(code: str, test_suite: list[dict]) -> tuple[float,
         return 0.0, []
 
     # Prepare a clean namespace with common helpers
-    namespace: dict = {}
+    namespace = _TEST_HELPERS.copy()
 
     # Strip main block so exec only defines functions
     clean_code = strip_main_block(code)
 
     try:
-        exec(clean_code, namespace)
+        exec(_compiled(clean_code, "exec"), namespace)
     except Exception as exc:
         _log.warning("run_function_tests_local: exec failed: %s", exc)
         return 0.0, [False] * len(test_suite)
@@ -139,8 +202,8 @@ def run_function_tests_local(code: str, test_suite: list[dict]) -> tuple[float,
     results: list[bool] = []
     for tc in test_suite:
         try:
-            actual = eval(tc["input"], namespace)
-            expected = eval(tc["expected_output"], namespace)
+            actual = eval(_compiled(tc["input"], "eval"), namespace)
+            expected = eval(_compiled(tc["expected_output"], "eval"), namespace)
             results.append(actual == expected)
         except Exception as exc:
             _log.debug("run_function_tests_local: test %s failed: %s", tc["input"], exc)
@@ -198,6 +261,7 @@ class LLM:
         system_prompt: str = CODING_SYSTEM_PROMPT,
         max_tokens: int = settings.max_tokens,
         temperature: float = 1.0,
+        http_client: httpx.AsyncClient | None = None,
     ) -> None:
         self.base_url = base_url or settings.openai_base_url
         self.api_key = api_key or settings.openai_api_key
@@ -207,9 +271,12 @@ class LLM:
         self.temperature = temperature
         self.last_usage: dict | None = None
 
+        # Constructing an LLM is cheap: the underlying connections come from
+        # the shared pool unless a caller injects its own client.
         self.client = AsyncOpenAI(
             api_key=self.api_key,
             base_url=self.base_url,
+            http_client=http_client or get_shared_http_client(),
         )
 
     async def generate(
@@ -310,19 +377,21 @@ class LLM:
 
         stream = await self.client.chat.completions.create(**create_kwargs)
 
-        async for chunk in stream:
-            if chunk.choices and chunk.choices[0].delta.content:
-                yield chunk.choices[0].delta.content
-            if include_usage and hasattr(chunk, "usage") and chunk.usage:
-                # Capture all available fields if it's a Pydantic model
-                if hasattr(chunk.usage, "model_dump"):
-                    self.last_usage = chunk.usage.model_dump()
-                else:
-                    self.last_usage = {
-                        "prompt_tokens": getattr(chunk.usage, "prompt_tokens", 0) or 0,
-                        "completion_tokens": getattr(chunk.usage, "completion_tokens", 0) or 0,
-                        "completion_tokens_details": getattr(chunk.usage, "completion_tokens_details", None),
-                    }
+        # Closing the stream releases the connection if the caller stops early.
+        async with stream:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+                if include_usage and hasattr(chunk, "usage") and chunk.usage:
+                    # Capture all available fields if it's a Pydantic model
+                    if hasattr(chunk.usage, "model_dump"):
+                        self.last_usage = chunk.usage.model_dump()
+                    else:
+                        self.last_usage = {
+                            "prompt_tokens": getattr(chunk.usage, "prompt_tokens", 0) or 0,
+                            "completion_tokens": getattr(chunk.usage, "completion_tokens", 0) or 0,
+                            "completion_tokens_details": getattr(chunk.usage, "completion_tokens_details", None),
+                        }
 
     def _build_messages(
         self,
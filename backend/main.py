@@ -7,7 +7,13 @@ import os
 import re
 import time
 import httpx
-import traceback
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from typing import Any
+from functools import lru_cache
+from itertools import islice
+from operator import itemgetter
+from pathlib import Path
 
 # Load .env into os.environ early so Modal (and other libs that read os.environ
 # directly) can pick up MODAL_TOKEN_ID / MODAL_TOKEN_SECRET.
@@ -21,7 +27,7 @@ import sentry_sdk
 from sentry_sdk.integrations.fastapi import FastApiIntegration
 from sentry_sdk.integrations.starlette import StarletteIntegration
 
-from contextlib import asynccontextmanager
+from contextlib import aclosing, asynccontextmanager
 
 from fastapi import Depends, FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
 from slowapi import _rate_limit_exceeded_handler
@@ -34,12 +40,33 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import StreamingResponse, Response
 from pydantic import BaseModel
+from pydantic_core import from_json, to_json
 
-from config import settings, limiter
+from config import CACHE_READ_MULTIPLIER, CACHE_WRITE_MULTIPLIER, limiter, resolve_pricing, settings
 from auth import get_current_user
 
+# High-volume or long-lived routes where a sampled APM transaction costs more
+# than it tells us (SSE/WebSocket streams, leaderboard and challenge reads).
+_UNTRACED_PATH_PREFIXES = ("/ws/", "/api/leaderboard", "/api/challenges")
+_TRACES_SAMPLE_RATE = 0.01
+
+
+def _sentry_traces_sampler(sampling_context: dict) -> float:
+    """Drop tracing for hot/streaming endpoints; sample everything else lightly."""
+    parent_sampled = sampling_context.get("parent_sampled")
+    if parent_sampled is not None:
+        return float(parent_sampled)
+    path = (sampling_context.get("asgi_scope") or {}).get("path", "")
+    if path.startswith(_UNTRACED_PATH_PREFIXES):
+        return 0.0
+    if path.startswith("/api/sessions/") and path.endswith("/events"):
+        return 0.0
+    return _TRACES_SAMPLE_RATE
+
+
 if settings.sentry_dsn:
     sentry_sdk.init(
         dsn=settings.sentry_dsn,
@@ -47,13 +74,13 @@ if settings.sentry_dsn:
             StarletteIntegration(transaction_style="endpoint"),
             FastApiIntegration(transaction_style="endpoint"),
         ],
-        traces_sample_rate=0.1,
+        traces_sampler=_sentry_traces_sampler,
         environment=settings.environment,
     )
 
-from llm import LLM
-from challenges import get_all_challenges, get_challenge_by_id
-from agents import get_all_agents, get_agent_by_id
+from llm import LLM, close_shared_http_client, estimate_tokens, get_shared_http_client
+from challenges import Challenge, get_all_challenges, get_challenge_by_id, get_test_suite_dicts
+from agents import Agent, get_all_agents, get_agent_by_id
 from agent_runner import run_agent_loop
 from agent_turn import execute_prompt_turn
 from sessions import (
@@ -65,6 +92,7 @@ from sessions import (
     get_leaderboard,
     Turn,
     LeaderboardEntry,
+    Session,
 )
 from evaluation import (
     compute_composite_score,
@@ -75,7 +103,15 @@ from evaluation import (
     GeneratedTestSuite,
     ChallengeEvaluator,
 )
-from sandbox import create_sandbox, terminate_sandbox
+import response_cache
+from sse import SSE_PING_FRAME, sse_chunk_frame, sse_error_frame, sse_frame
+from sandbox import (
+    SandboxCapacityError,
+    create_sandbox,
+    drain_warm_pool,
+    reap_idle_sandboxes,
+    terminate_sandbox,
+)
 from session_events import (
     broadcast_session_event,
     subscribe_session_events,
@@ -91,15 +127,117 @@ from integrations.router import router as integrations_router
 
 _CLEANUP_INTERVAL_SECONDS = 300  # run every 5 minutes
 
+# Repository root; challenge html_url paths (e.g. "backend/challenge_code/x.html")
+# are relative to it.
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# html_url -> (mtime_ns, content, digest). Reference pages are static files
+# read on every UI evaluation; re-read only when the file changes.
+_REFERENCE_HTML_CACHE: dict[str, tuple[int, str, str]] = {}
+
+
+def _read_reference_html(html_url: str) -> tuple[str, str]:
+    """
+    Content and digest of a challenge's reference HTML (blocking; see
+    _load_reference_html). Raises FileNotFoundError if the file is missing.
+    """
+    html_path = _PROJECT_ROOT / html_url
+    mtime_ns = html_path.stat().st_mtime_ns
+    cached = _REFERENCE_HTML_CACHE.get(html_url)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1], cached[2]
+    content = html_path.read_text(encoding="utf-8")
+    digest = response_cache.cache_key(content)
+    _REFERENCE_HTML_CACHE[html_url] = (mtime_ns, content, digest)
+    return content, digest
+
+
+async def _load_reference_html(html_url: str) -> tuple[str, str]:
+    """_read_reference_html in a worker thread, so disk I/O never blocks the loop."""
+    return await asyncio.to_thread(_read_reference_html, html_url)
+
+# Per-request timeout for direct Anthropic streaming calls made on the shared
+# connection pool (whose default timeout is sized for long non-streaming calls).
+_ANTHROPIC_STREAM_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
+
+_EPHEMERAL_CACHE = {"type": "ephemeral"}
+
+
+def _anthropic_cached_system(text: str) -> list[dict]:
+    """System prompt as a content block marked for Anthropic prompt caching."""
+    return [{"type": "text", "text": text, "cache_control": _EPHEMERAL_CACHE}]
+
+
+def _anthropic_cached_messages(messages: list[dict]) -> list[dict]:
+    """Mark the last assistant turn as a cache breakpoint.
+
+    Everything up to and including that turn is the stable conversation prefix;
+    only the trailing user prompt is new on each request, so later turns read
+    the prefix from Anthropic's prompt cache instead of paying for it again.
+    """
+    for i in range(len(messages) - 1, -1, -1):
+        m = messages[i]
+        if m["role"] == "assistant" and isinstance(m["content"], str) and m["content"]:
+            marked = list(messages)
+            marked[i] = {
+                "role": "assistant",
+                "content": [{"type": "text", "text": m["content"], "cache_control": _EPHEMERAL_CACHE}],
+            }
+            return marked
+    return messages
+
 
 async def _session_cleanup_loop() -> None:
-    """Periodically purge scoring sessions older than the TTL."""
+    """Periodically purge scoring sessions older than the TTL and idle sandboxes."""
     while True:
         await asyncio.sleep(_CLEANUP_INTERVAL_SECONDS)
         try:
             cleanup_expired_sessions()
         except Exception:
             logging.getLogger(__name__).exception("Error during session cleanup")
+        try:
+            reaped = await reap_idle_sandboxes()
+            if reaped:
+                logger.info("Terminated %d idle sandbox(es)", reaped)
+        except Exception:
+            logger.exception("Error while terminating idle sandboxes")
+
+
+def _warm_caches() -> None:
+    """Materialise per-challenge caches (test suites, reference HTML) and the
+    LLM connection pool before serving.
+
+    Keeps the first request after a worker restart from paying for them.
+    """
+    started = time.perf_counter()
+    challenges = get_all_challenges()
+    for challenge in challenges:
+        get_test_suite_dicts(challenge.id)
+        if challenge.html_url:
+            try:
+                _read_reference_html(challenge.html_url)
+            except OSError:
+                logger.warning("Challenge %s references missing HTML file %s", challenge.id, challenge.html_url)
+    agents = get_all_agents()
+    get_shared_http_client()
+    logger.info(
+        "Warmup complete in %.1fms (%d challenges, %d agents)",
+        (time.perf_counter() - started) * 1000,
+        len(challenges),
+        len(agents),
+    )
+
+
+async def _prefetch_research_insights() -> None:
+    """Fill the research cache for every product challenge in the background.
+
+    PRD feedback keys its Perplexity research on the challenge description, so
+    fetching it at startup takes that call off the feedback request path.
+    """
+    if not settings.perplexity_api_key:
+        return
+    statements = {c.description for c in get_all_challenges() if c.category == "product" and c.description}
+    await asyncio.gather(*(_fetch_research_insights(s) for s in statements))
 
 
 @asynccontextmanager
@@ -117,12 +255,22 @@ async def _lifespan(app: FastAPI):
         _agent_log.addHandler(_h)
         _agent_log.propagate = False
 
+    _warm_caches()
+    research_task = asyncio.get_event_loop().create_task(_prefetch_research_insights())
+
     # Start background session-cleanup loop.
     cleanup_task = asyncio.get_event_loop().create_task(_session_cleanup_loop())
 
     yield  # application runs
 
+    research_task.cancel()
     cleanup_task.cancel()
+    # Sandboxes handed to users are left running: they reconnect by id after a
+    # restart. Pooled ones would be orphaned.
+    drained = await drain_warm_pool()
+    if drained:
+        logger.info("Terminated %d warm sandbox(es)", drained)
+    await close_shared_http_client()
 
 
 app = FastAPI(title="No Shot", version="0.1.0", lifespan=_lifespan)
@@ -131,6 +279,10 @@ app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
 
 app.add_middleware(SlowAPIMiddleware)
+# Compresses JSON bodies (challenge lists, judge feedback, test results).
+# Starlette excludes text/event-stream by default, so SSE chunks are never
+# held back in the compressor.
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.cors_origins,
@@ -147,6 +299,7 @@ app.include_router(integrations_router)
 llm = LLM()
 
 
+@lru_cache(maxsize=16)
 def _create_judge_llm(
     *,
     system_prompt: str,
@@ -156,6 +309,10 @@ def _create_judge_llm(
     """
     Build the default judge/scoring LLM client.
     Prefers xAI for Grok judge models and gracefully falls back to OpenAI.
+
+    Cached per (system_prompt, temperature, model): judge prompts are static,
+    so every submit/feedback call reuses the same client. Callers only use
+    generate()/stream() without include_usage, which keep no per-call state.
     """
     judge_model = model or settings.judge_model
     is_grok_judge = judge_model.startswith("grok")
@@ -239,7 +396,7 @@ class AgentRunRequest(BaseModel):
 
 
 @app.get("/api/challenges")
-async def list_challenges(category: str | None = None, difficulty: str | None = None):
+async def list_challenges(category: str | None = None, difficulty: str | None = None) -> list[Challenge]:
     challenges = get_all_challenges()
     if category:
         challenges = [c for c in challenges if c.category == category]
@@ -262,7 +419,7 @@ async def get_daily_attempts(user_id: str = Depends(get_current_user)):
 
 
 @app.get("/api/challenges/{challenge_id}")
-async def get_challenge(challenge_id: str):
+async def get_challenge(challenge_id: str) -> Challenge:
     challenge = get_challenge_by_id(challenge_id)
     if challenge is None:
         raise HTTPException(status_code=404, detail="Challenge not found")
@@ -279,19 +436,13 @@ async def get_challenge_html(challenge_id: str):
     if not challenge.html_url:
         raise HTTPException(status_code=404, detail="Challenge has no html_url")
     
-    from pathlib import Path
-    # html_url is a path like "backend/challenge_code/openai-landing.html"
-    # We need to resolve it relative to the project root
-    project_root = Path(__file__).parent.parent
-    html_path = project_root / challenge.html_url
-    
-    if not html_path.exists():
-        raise HTTPException(status_code=404, detail=f"HTML file not found: {challenge.html_url}")
-    
+    # html_url is a path like "backend/challenge_code/openai-landing.html",
+    # relative to the project root
     try:
-        with open(html_path, "r", encoding="utf-8") as f:
-            html_content = f.read()
+        html_content, _ = await _load_reference_html(challenge.html_url)
         return Response(content=html_content, media_type="text/html")
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"HTML file not found: {challenge.html_url}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to read HTML file: {str(e)}")
 
@@ -330,13 +481,237 @@ async def start_session(req: CreateSessionRequest):
 
 
 @app.get("/api/sessions/{session_id}")
-async def get_session_state(session_id: str):
+async def get_session_state(session_id: str) -> Session:
     session = get_session(session_id)
     if session is None:
         raise HTTPException(status_code=404, detail="Session not found")
     return session
 
 
+# Websocket stream messages, like SSE chunk frames, splice the chunk into a
+# constant envelope instead of re-serializing a dict.
+_WS_STREAM_PREFIX = '{"type":"stream","content":'
+
+
+# Upstream error bodies are echoed to the client; cap how much is buffered.
+_ERROR_BODY_LIMIT = 4096
+
+
+async def _read_error_body(response: httpx.Response) -> str:
+    """Read at most ``_ERROR_BODY_LIMIT`` bytes of a failed streaming response."""
+    buf = b""
+    async for raw in response.aiter_bytes():
+        buf += raw
+        if len(buf) >= _ERROR_BODY_LIMIT:
+            break
+    return buf[:_ERROR_BODY_LIMIT].decode(errors="replace")
+
+
+def _anthropic_session_payload(api_model: str, session: Session, prompt_text: str) -> bytes:
+    """Streaming Messages request body for the next prompt in *session*.
+
+    Earlier messages come pre-encoded from ``Session.history_json()``, so each
+    turn only serializes the new prompt and the cache-marked last reply.
+    """
+    encoded = session.history_json()
+    history = session.history()
+    parts = list(encoded)
+    if history and history[-1]["role"] == "assistant" and history[-1]["content"]:
+        parts[-1] = to_json(_anthropic_cached_messages(history[-1:])[0])
+    parts.append(to_json({"role": "user", "content": prompt_text}))
+    return (
+        b'{"model":' + to_json(api_model)
+        + b',"max_tokens":' + str(settings.max_tokens).encode()
+        + b',"stream":true,"messages":[' + b",".join(parts) + b"]}"
+    )
+
+
+# Anthropic stream events the handlers act on; anything else (ping,
+# content_block_start/stop) is skipped without being parsed.
+_ANTHROPIC_STREAM_EVENTS = (b'"content_block_delta"', b'"message_start"', b'"message_delta"', b'"message_stop"')
+
+# The text of a text_delta; only this string literal is JSON-decoded.
+_DELTA_TEXT_RE = re.compile(rb'"text":"((?:[^"\\]|\\.)*)"')
+
+
+async def _anthropic_stream_events(response: httpx.Response) -> AsyncIterator[tuple[str, Any]]:
+    """Yield ``(event_type, data)`` from an Anthropic Messages SSE stream.
+
+    ``content_block_delta`` events yield the delta text as a str without
+    building the event dict; other events yield the parsed payload.
+    """
+    buf = b""
+    async for raw in response.aiter_bytes():
+        buf += raw
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            if line[:6] != b"data: ":
+                continue
+            payload = line[6:].rstrip(b"\r")
+            if payload == b"[DONE]":
+                return
+            if b'"content_block_delta"' in payload:
+                m = _DELTA_TEXT_RE.search(payload)
+                # No match: non-text delta (tool input, thinking) or empty text.
+                if m is None or not m.group(1):
+                    continue
+                try:
+                    yield "content_block_delta", from_json(b'"' + m.group(1) + b'"')
+                except ValueError:
+                    continue
+                continue
+            if not any(evt in payload for evt in _ANTHROPIC_STREAM_EVENTS):
+                continue
+            try:
+                data = from_json(payload)
+            except ValueError:
+                continue
+            yield data.get("type", ""), data
+
+
+# Map short Claude names → full Anthropic API model IDs
+_CLAUDE_MODEL_IDS = {
+    "claude-opus-4-6": "claude-opus-4-6",
+    "claude-sonnet-4-5": "claude-sonnet-4-5-20250929",
+    "claude-haiku-4-5": "claude-haiku-4-5-20251001",
+}
+
+# Model-name prefix → chat provider. Models matching none of these use OpenAI.
+_PROVIDER_PREFIXES = (("claude", "anthropic"), ("grok", "xai"), ("sonar", "perplexity"))
+
+
+@lru_cache(maxsize=256)
+def _chat_provider_name(model: str) -> str:
+    """Provider for *model*: "anthropic", "xai", "perplexity" or "openai"."""
+    for prefix, name in _PROVIDER_PREFIXES:
+        if model.startswith(prefix):
+            return name
+    return "openai"
+
+
+@dataclass(frozen=True)
+class _ChatProvider:
+    """An OpenAI-compatible chat API: where to reach it and how to bill it."""
+
+    name: str
+    label: str
+    base_url_setting: str
+    api_key_setting: str
+    # (input, output) per-1M-token rates used when the model isn't in MODEL_PRICING.
+    fallback_pricing: tuple[float, float]
+    # xAI reports reasoning tokens separately from completion_tokens.
+    bills_reasoning_tokens: bool = False
+
+    @property
+    def base_url(self) -> str:
+        return getattr(settings, self.base_url_setting)
+
+    @property
+    def api_key(self) -> str:
+        return getattr(settings, self.api_key_setting)
+
+
+_OPENAI_COMPATIBLE_PROVIDERS: dict[str, _ChatProvider] = {
+    p.name: p
+    for p in (
+        _ChatProvider("xai", "xAI", "xai_base_url", "xai_api_key", (0.20, 0.50), bills_reasoning_tokens=True),
+        _ChatProvider("perplexity", "Perplexity", "perplexity_base_url", "perplexity_api_key", (3.0, 15.0)),
+        _ChatProvider("openai", "OpenAI", "openai_base_url", "openai_api_key", (0.0, 0.0)),
+    )
+}
+
+
+@lru_cache(maxsize=32)
+def _provider_llm(provider_name: str, model: str) -> LLM:
+    """
+    Shared client for *model* on an OpenAI-compatible provider.
+
+    Only for callers that stream without include_usage: last_usage is
+    per-instance state, so usage-tracking calls build their own LLM.
+    """
+    provider = _OPENAI_COMPATIBLE_PROVIDERS[provider_name]
+    return LLM(base_url=provider.base_url, api_key=provider.api_key, model=model)
+
+
+def _to_openai_messages(messages: list[dict]) -> tuple[list[dict], str]:
+    """Split a chat transcript into (history, current_prompt) for LLM.stream.
+
+    Consecutive user messages collapse so only the latest one is kept as the
+    pending prompt; it is flushed into history when an assistant reply follows.
+    """
+    history: list[dict] = []
+    current_prompt = ""
+    for msg in messages:
+        if msg["role"] == "user":
+            if current_prompt:
+                history.append({"role": "user", "content": current_prompt})
+            current_prompt = msg["content"]
+        elif msg["role"] == "assistant":
+            if current_prompt:
+                history.append({"role": "user", "content": current_prompt})
+                current_prompt = ""
+            history.append({"role": "assistant", "content": msg["content"]})
+    return history, current_prompt
+
+
+async def _ws_send(ws: WebSocket, payload: dict) -> None:
+    """Send *payload* as a JSON text frame, serialized without stdlib json."""
+    await ws.send_text(to_json(payload).decode())
+
+
+async def _ws_sender(ws: WebSocket, outbox: asyncio.Queue[dict]) -> None:
+    """Drain *outbox* to *ws* in order, one writer per connection.
+
+    Stream chunks that pile up while a send is in flight are merged into a
+    single ``stream`` frame, so a fast provider costs one encode and one
+    socket write per batch instead of per token.
+    """
+    pending: dict | None = None
+    try:
+        while True:
+            msg = pending if pending is not None else await outbox.get()
+            pending = None
+            if msg["type"] == "stream" and not outbox.empty():
+                parts = [msg["content"]]
+                while not outbox.empty():
+                    nxt = outbox.get_nowait()
+                    if nxt["type"] != "stream":
+                        pending = nxt
+                        break
+                    parts.append(nxt["content"])
+                msg = {"type": "stream", "content": "".join(parts)}
+            if msg["type"] == "stream":
+                await ws.send_text(_WS_STREAM_PREFIX + to_json(msg["content"]).decode() + "}")
+            else:
+                await _ws_send(ws, msg)
+    except (WebSocketDisconnect, RuntimeError):
+        # Client went away; _ws_enqueue stops the producer on its next frame.
+        return
+
+
+# Frames buffered per connection; a slow client throttles generation to its
+# own pace instead of growing the outbox without bound.
+_WS_OUTBOX_MAX_FRAMES = 256
+
+
+async def _ws_enqueue(outbox: asyncio.Queue[dict], sender_task: asyncio.Task, msg: dict) -> None:
+    """Queue *msg* for _ws_sender, waiting while the outbox is full.
+
+    Raises WebSocketDisconnect once the sender has stopped, so the caller
+    stops generating for a client that is gone.
+    """
+    if sender_task.done():
+        raise WebSocketDisconnect()
+    if not outbox.full():
+        outbox.put_nowait(msg)
+        return
+    put = asyncio.ensure_future(outbox.put(msg))
+    await asyncio.wait((put, sender_task), return_when=asyncio.FIRST_COMPLETED)
+    if not put.done():
+        put.cancel()
+        raise WebSocketDisconnect()
+
+
 @app.get("/api/sessions/{session_id}/events")
 async def session_events_stream(session_id: str):
     """
@@ -352,12 +727,18 @@ async def session_events_stream(session_id: str):
     async def event_generator():
         try:
             while True:
-                try:
-                    event = await asyncio.wait_for(queue.get(), timeout=30.0)
-                    # SSE format: "data: {json}\n\n"
-                    yield f"data: {json.dumps(event)}\n\n"
-                except asyncio.TimeoutError:
-                    yield f"data: {json.dumps({'type': 'ping'})}\n\n"
+                # Drain pending events without arming a timer; only an idle
+                # queue needs the 30s heartbeat timeout.
+                if not queue.empty():
+                    event = queue.get_nowait()
+                else:
+                    try:
+                        async with asyncio.timeout(30.0):
+                            event = await queue.get()
+                    except TimeoutError:
+                        yield SSE_PING_FRAME
+                        continue
+                yield sse_frame(event)
         except asyncio.CancelledError:
             pass
         finally:
@@ -478,7 +859,7 @@ async def leaderboard(
     offset: int = 0,
     username: str | None = None,
     sort_by: str = "composite_score",
-):
+) -> dict:
     """Per-question leaderboard: best attempt per user, paginated."""
     from database import get_leaderboard as get_db_leaderboard
 
@@ -496,7 +877,7 @@ async def leaderboard_overall(
     limit: int = 10,
     offset: int = 0,
     username: str | None = None,
-):
+) -> dict:
     """Overall leaderboard: sum of top scores across challenges, paginated."""
     from database import get_overall_leaderboard
 
@@ -553,8 +934,7 @@ async def create_username(req: SetUsernameRequest, user_id: str = Depends(get_cu
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"create_username failed: {type(e).__name__}: {e}")
-        logger.error(traceback.format_exc())
+        logger.exception("create_username failed: %s: %s", type(e).__name__, e)
         raise HTTPException(
             status_code=500,
             detail=f"create_username failed: {type(e).__name__}: {e}",
@@ -636,6 +1016,40 @@ class SubmitScoreRequest(BaseModel):
     prd_content: str | None = None
 
 
+# Static judge prompt for UI submissions; only the three fields vary per request.
+_SUBMIT_UI_EVAL_PROMPT = """You are a generous and encouraging evaluator assessing how well someone recreated a UI challenge. Your goal is to reward effort and high-level accuracy, not penalize for minor differences.
+
+                    Compare the reference HTML with the generated HTML and score from 0-100 based on **visual and functional similarity**, not code exactness.
+
+                    **Be generous**: if the overall purpose and key elements are present, that deserves a high score (70+). Only give low scores if the output is clearly missing major sections or looks completely different.
+
+                    Scoring guide:
+                    - 90-100: Looks nearly identical, all major elements present
+                    - 70-89: Clearly the same page, minor visual differences
+                    - 50-69: Right idea, missing some elements or styling is off
+                    - 30-49: Partial match, missing significant sections
+                    - 0-29: Major structural differences or wrong content entirely
+
+                    **Challenge Description:**
+                    {description}
+
+                    **Reference HTML:**
+                    ```html
+                    {reference_html}
+                    ```
+
+                    **Generated HTML:**
+                    ```html
+                    {generated_html}
+                    ```
+
+                    Respond in JSON only:
+                    {{"score": <0-100>, "reasoning": "<brief explanation focusing on what matched well>"}}"""
+
+# First {...} in the submit judge's reply (its JSON is flat).
+_JSON_OBJECT_RE = re.compile(r'\{.*?\}', re.DOTALL)
+
+
 @app.post("/api/scoring-sessions")
 async def create_scoring_session_endpoint(req: CreateScoringSessionRequest, user_id: str = Depends(get_current_user)):
     """Create a server-side scoring session for tamper-proof stat tracking."""
@@ -677,48 +1091,24 @@ async def submit_scoring_session(session_id: str, req: SubmitScoreRequest, user_
     elif is_ui:
         if req.generated_html:
             try:
-                from pathlib import Path
-                project_root = Path(__file__).parent.parent
-                html_path = project_root / challenge.html_url
-                with open(html_path, "r", encoding="utf-8") as f:
-                    reference_html = f.read()
-                evaluation_prompt = f"""You are a generous and encouraging evaluator assessing how well someone recreated a UI challenge. Your goal is to reward effort and high-level accuracy, not penalize for minor differences.
-
-                    Compare the reference HTML with the generated HTML and score from 0-100 based on **visual and functional similarity**, not code exactness.
-
-                    **Be generous**: if the overall purpose and key elements are present, that deserves a high score (70+). Only give low scores if the output is clearly missing major sections or looks completely different.
-
-                    Scoring guide:
-                    - 90-100: Looks nearly identical, all major elements present
-                    - 70-89: Clearly the same page, minor visual differences
-                    - 50-69: Right idea, missing some elements or styling is off
-                    - 30-49: Partial match, missing significant sections
-                    - 0-29: Major structural differences or wrong content entirely
-
-                    **Challenge Description:**
-                    {challenge.description}
-
-                    **Reference HTML:**
-                    ```html
-                    {reference_html}
-                    ```
-
-                    **Generated HTML:**
-                    ```html
-                    {req.generated_html}
-                    ```
-
-                    Respond in JSON only:
-                    {{"score": <0-100>, "reasoning": "<brief explanation focusing on what matched well>"}}"""
+                reference_html, _ = await _load_reference_html(challenge.html_url)
+                reference_html, generated_html = _fit_html_to_token_budget(
+                    reference_html, req.generated_html, settings.ui_evaluation_max_html_tokens,
+                )
+                evaluation_prompt = _SUBMIT_UI_EVAL_PROMPT.format(
+                    description=challenge.description,
+                    reference_html=reference_html,
+                    generated_html=generated_html,
+                )
                 llm = _create_judge_llm(
                     model=settings.judge_model,
                     system_prompt="You are an expert HTML/CSS/JavaScript evaluator. Provide accurate and detailed similarity assessments.",
                     temperature=0.3,
                 )
                 response = await llm.generate(evaluation_prompt)
-                json_match = re.search(r'\{.*?\}', response.response_text, re.DOTALL)
+                json_match = _JSON_OBJECT_RE.search(response.response_text)
                 if json_match:
-                    result = json.loads(json_match.group(0))
+                    result = await _parse_judge_json(json_match.group(0))
                     accuracy = max(0.0, min(1.0, result.get("score", 0) / 100))
             except Exception as e:
                 logger.error(f"UI evaluation failed during submit: {e}")
@@ -727,7 +1117,7 @@ async def submit_scoring_session(session_id: str, req: SubmitScoreRequest, user_
             accuracy = session.last_test_accuracy
         elif req.code and req.sandbox_id:
             try:
-                test_dicts = [t.model_dump() for t in challenge.test_suite]
+                test_dicts = get_test_suite_dicts(challenge.id)
                 raw_results = await run_function_tests_detailed(req.sandbox_id, req.code, test_dicts)
                 passed = sum(1 for r in raw_results if r.get("passed"))
                 accuracy = passed / len(raw_results) if raw_results else 0.0
@@ -857,7 +1247,7 @@ async def submit_scoring_session(session_id: str, req: SubmitScoreRequest, user_
 
 
 @app.get("/api/agents")
-async def list_agents():
+async def list_agents() -> list[Agent]:
     return get_all_agents()
 
 
@@ -917,11 +1307,14 @@ async def session_ws(ws: WebSocket, session_id: str):
 
     session = get_session(session_id)
     if session is None:
-        await ws.send_json({"type": "error", "message": "Session not found"})
+        await _ws_send(ws, {"type": "error", "message": "Session not found"})
         await ws.close()
         return
 
     challenge = get_challenge_by_id(session.challenge_id)
+    test_gen_task: asyncio.Task | None = None
+    outbox: asyncio.Queue[dict] = asyncio.Queue(maxsize=_WS_OUTBOX_MAX_FRAMES)
+    sender_task = asyncio.create_task(_ws_sender(ws, outbox))
 
     try:
         while True:
@@ -932,126 +1325,71 @@ async def session_ws(ws: WebSocket, session_id: str):
                 prompt_text = msg.get("content", "")
                 model = msg.get("model") or session.model_used
 
-                # Build conversation history
-                history: list[dict] = []
-                for turn in session.turns:
-                    history.append({"role": "user", "content": turn.prompt_text})
-                    history.append({"role": "assistant", "content": turn.response_text})
+                # Test generation depends only on the challenge, so run it
+                # alongside the model stream instead of after it.
+                test_gen_task = None
+                if challenge and not challenge.test_suite:
+                    test_gen_task = asyncio.create_task(test_generator.generate_tests(challenge))
+
+                history = session.history()
 
                 # ── Route to the correct provider based on model name ──
-                is_claude = model.startswith("claude")
-                is_grok = model.startswith("grok")
-                is_perplexity = model.startswith("sonar")
-
-                # Map short Claude names → full Anthropic API model IDs
-                CLAUDE_MODEL_MAPPING = {
-                    "claude-opus-4-6": "claude-opus-4-6",
-                    "claude-sonnet-4-5": "claude-sonnet-4-5-20250929",
-                    "claude-haiku-4-5": "claude-haiku-4-5-20251001",
-                }
+                provider_name = _chat_provider_name(model)
 
                 full_response = ""
 
-                if is_claude and settings.anthropic_api_key:
+                if provider_name == "anthropic" and settings.anthropic_api_key:
                     # ── Anthropic (native API via httpx) ──
-                    api_model = CLAUDE_MODEL_MAPPING.get(model, model)
-                    messages_for_api = []
-                    for h in history:
-                        messages_for_api.append({"role": h["role"], "content": h["content"]})
-                    messages_for_api.append({"role": "user", "content": prompt_text})
-
-                    async with httpx.AsyncClient(timeout=60.0) as http_client:
-                        headers = {
-                            "x-api-key": settings.anthropic_api_key,
-                            "anthropic-version": "2023-06-01",
-                            "content-type": "application/json",
-                        }
-                        payload = {
-                            "model": api_model,
-                            "max_tokens": settings.max_tokens,
-                            "messages": messages_for_api,
-                            "stream": True,
-                        }
-                        async with http_client.stream(
-                            "POST",
-                            "https://api.anthropic.com/v1/messages",
-                            headers=headers,
-                            json=payload,
-                        ) as resp:
-                            if resp.status_code != 200:
-                                error_text = (await resp.aread()).decode()
-                                await ws.send_json({"type": "error", "message": f"Anthropic API error ({resp.status_code}): {error_text}"})
-                                continue
-                            async for line in resp.aiter_lines():
-                                if line.startswith("data: "):
-                                    data_str = line[6:]
-                                    if data_str == "[DONE]":
-                                        break
-                                    try:
-                                        data = json.loads(data_str)
-                                        evt = data.get("type")
-                                        if evt == "content_block_delta":
-                                            chunk = data.get("delta", {}).get("text", "")
-                                            if chunk:
-                                                full_response += chunk
-                                                await ws.send_json({"type": "stream", "content": chunk})
-                                        elif evt == "message_stop":
-                                            break
-                                    except json.JSONDecodeError:
-                                        continue
-
-                elif is_grok and settings.xai_api_key:
-                    # ── xAI / Grok (OpenAI-compatible) ──
-                    llm_instance = LLM(
-                        base_url=settings.xai_base_url,
-                        api_key=settings.xai_api_key,
-                        model=model,
-                    )
-                    async for chunk in llm_instance.stream(
-                        prompt_text,
-                        conversation_history=history if history else None,
-                    ):
-                        full_response += chunk
-                        await ws.send_json({"type": "stream", "content": chunk})
-
-                elif is_perplexity and settings.perplexity_api_key:
-                    # ── Perplexity Sonar (OpenAI-compatible) ──
-                    llm_instance = LLM(
-                        base_url=settings.perplexity_base_url,
-                        api_key=settings.perplexity_api_key,
-                        model=model,
-                    )
-                    async for chunk in llm_instance.stream(
-                        prompt_text,
-                        conversation_history=history if history else None,
-                    ):
-                        full_response += chunk
-                        await ws.send_json({"type": "stream", "content": chunk})
+                    api_model = _CLAUDE_MODEL_IDS.get(model, model)
+
+                    http_client = get_shared_http_client()
+                    headers = {
+                        "x-api-key": settings.anthropic_api_key,
+                        "anthropic-version": "2023-06-01",
+                        "content-type": "application/json",
+                    }
+                    async with http_client.stream(
+                        "POST",
+                        "https://api.anthropic.com/v1/messages",
+                        headers=headers,
+                        content=_anthropic_session_payload(api_model, session, prompt_text),
+                        timeout=_ANTHROPIC_STREAM_TIMEOUT,
+                    ) as resp:
+                        if resp.status_code != 200:
+                            error_text = await _read_error_body(resp)
+                            await _ws_enqueue(outbox, sender_task, {"type": "error", "message": f"Anthropic API error ({resp.status_code}): {error_text}"})
+                            if test_gen_task is not None:
+                                test_gen_task.cancel()
+                            continue
+                        async for evt, data in _anthropic_stream_events(resp):
+                            if evt == "content_block_delta":
+                                full_response += data
+                                await _ws_enqueue(outbox, sender_task, {"type": "stream", "content": data})
+                            elif evt == "message_stop":
+                                break
 
                 else:
-                    # ── OpenAI (default) ──
-                    if model != llm.model:
-                        llm_instance = LLM(model=model)
-                    else:
-                        llm_instance = llm
+                    # ── OpenAI-compatible (xAI Grok, Perplexity Sonar, OpenAI default) ──
+                    provider = _OPENAI_COMPATIBLE_PROVIDERS.get(provider_name)
+                    if provider is None or not provider.api_key:
+                        provider = _OPENAI_COMPATIBLE_PROVIDERS["openai"]
 
-                    # GPT-5 Mini and Nano require temperature=1
-                    temperature = None
+                    if provider.name == "openai" and model == llm.model:
+                        llm_instance = llm
+                    else:
+                        llm_instance = _provider_llm(provider.name, model)
 
                     async for chunk in llm_instance.stream(
                         prompt_text,
                         conversation_history=history if history else None,
-                        temperature=temperature,
                     ):
                         full_response += chunk
-                        await ws.send_json({"type": "stream", "content": chunk})
+                        await _ws_enqueue(outbox, sender_task, {"type": "stream", "content": chunk})
 
                 generated_code = LLM.extract_code_blocks(full_response)
 
-                # Generate tests if needed and evaluate
-                generated_test_suite = None
-                if challenge and not challenge.test_suite:
-                    generated_test_suite = await test_generator.generate_tests(challenge)
+                generated_test_suite = await test_gen_task if test_gen_task is not None else None
+                test_gen_task = None
                 
                 # Evaluate using the new evaluator system
                 accuracy = 0.0
@@ -1068,8 +1406,8 @@ async def session_ws(ws: WebSocket, session_id: str):
 
                 # We don't have token counts in streaming mode (most APIs
                 # don't return them mid-stream), so estimate from text length.
-                est_prompt_tokens = len(prompt_text.split()) * 2
-                est_response_tokens = len(full_response.split()) * 2
+                est_prompt_tokens = estimate_tokens(prompt_text)
+                est_response_tokens = estimate_tokens(full_response)
 
                 turn = Turn(
                     turn_number=len(session.turns) + 1,
@@ -1083,7 +1421,7 @@ async def session_ws(ws: WebSocket, session_id: str):
                 )
                 add_turn(session_id, turn)
 
-                await ws.send_json({
+                await _ws_enqueue(outbox, sender_task, {
                     "type": "complete",
                     "turn_number": turn.turn_number,
                     "generated_code": generated_code,
@@ -1097,6 +1435,10 @@ async def session_ws(ws: WebSocket, session_id: str):
 
     except WebSocketDisconnect:
         pass
+    finally:
+        sender_task.cancel()
+        if test_gen_task is not None:
+            test_gen_task.cancel()
 
 
 # ---------------------------------------------------------------------------
@@ -1140,12 +1482,7 @@ async def chat_stream(req: ChatRequest, request: Request, user_id: str = Depends
                 await record_challenge_attempt(username, req.challenge_id)
 
     # Convert messages to Anthropic format (or OpenAI format if using OpenRouter)
-    anthropic_messages = []
-    for msg in req.messages:
-        anthropic_messages.append({
-            "role": msg.role,
-            "content": msg.content
-        })
+    anthropic_messages = [{"role": m.role, "content": m.content} for m in req.messages]
     
     if not anthropic_messages or anthropic_messages[-1]["role"] != "user":
         raise HTTPException(status_code=400, detail="Last message must be from user")
@@ -1160,18 +1497,12 @@ async def chat_stream(req: ChatRequest, request: Request, user_id: str = Depends
         if challenge and getattr(challenge, "category", None) == "product" and getattr(challenge, "agent_context", None):
             system_message = challenge.agent_context
     
-    # Determine if we should use Anthropic API directly based on model name
-    # Default to OpenAI if model is not explicitly Claude
-    is_claude_model = req.model is not None and req.model.startswith("claude")
-    use_anthropic = bool(settings.anthropic_api_key) and is_claude_model
-    
-    # Determine if we should use xAI API for Grok models
-    is_grok_model = req.model is not None and req.model.startswith("grok")
-    use_xai = bool(settings.xai_api_key) and is_grok_model
-    
-    # Determine if we should use Perplexity Sonar API
-    is_perplexity_model = req.model is not None and (req.model.startswith("sonar") or req.model == "sonar-pro")
-    use_perplexity = bool(settings.perplexity_api_key) and is_perplexity_model
+    # Route by model name prefix; anything unrecognised (or with no key for its
+    # provider) goes to OpenAI.
+    provider_name = _chat_provider_name(req.model) if req.model is not None else "openai"
+    use_anthropic = bool(settings.anthropic_api_key) and provider_name == "anthropic"
+    use_xai = bool(settings.xai_api_key) and provider_name == "xai"
+    use_perplexity = bool(settings.perplexity_api_key) and provider_name == "perplexity"
     
     # Validate that we have at least one API key configured
     if not use_anthropic and not use_xai and not use_perplexity and not settings.openai_api_key:
@@ -1190,313 +1521,154 @@ async def chat_stream(req: ChatRequest, request: Request, user_id: str = Depends
             detail="PERPLEXITY_API_KEY is not configured. Please set it in your .env file to use Perplexity Sonar."
         )
     
-    # Use correct Anthropic model names
-    # Valid models: claude-3-5-sonnet-20240620, claude-3-opus-20240229, claude-3-sonnet-20240229, claude-3-haiku-20240307
-    # Map short names to full IDs for Anthropic API
-    MODEL_MAPPING = {
-        "claude-opus-4-6": "claude-opus-4-6",  # Assuming standard date suffix or similar
-        "claude-sonnet-4-5": "claude-sonnet-4-5-20250929",
-        "claude-haiku-4-5": "claude-haiku-4-5-20251001",
-    }
-    
     raw_model = req.model or settings.default_model
-    model = MODEL_MAPPING.get(raw_model, raw_model)
+    model = _CLAUDE_MODEL_IDS.get(raw_model, raw_model)
     
     user_last_msg = anthropic_messages[-1]["content"] if anthropic_messages else ""
 
+    # Unscored product-challenge chats can reuse an identical earlier conversation.
+    response_cache_key = None
+    if is_product and not req.scoring_session_id and settings.product_response_cache_seconds > 0:
+        response_cache_key = response_cache.cache_key(model, system_message, anthropic_messages)
+
     async def generate():
         """Generator function for SSE streaming."""
-        _ss_start = time.time()
+        _ss_start = time.monotonic()
         _turn_recorded = False
         _partial_response = ""
+        if response_cache_key is not None:
+            cached = response_cache.product_chat.get(response_cache_key, settings.product_response_cache_seconds)
+            if cached is not None:
+                yield sse_chunk_frame(cached)
+                yield sse_frame({'type': 'done', 'content': cached, 'input_tokens': 0, 'output_tokens': 0, 'cost': 0.0, 'cached': True})
+                return
         try:
             if use_anthropic:
                 # Use Anthropic API directly
-                async with httpx.AsyncClient(timeout=60.0) as client:
-                    headers = {
-                        "x-api-key": settings.anthropic_api_key,
-                        "anthropic-version": "2023-06-01",
-                        "content-type": "application/json",
-                    }
-                    
-                    messages_for_api = anthropic_messages.copy()
-
-                    payload = {
-                        "model": model,
-                        "max_tokens": settings.max_tokens,
-                        "messages": messages_for_api,
-                        "system": system_message,
-                        "stream": True,
-                    }
-                    
-                    async with client.stream(
-                        "POST",
-                        "https://api.anthropic.com/v1/messages",
-                        headers=headers,
-                        json=payload,
-                    ) as response:
-                        if response.status_code != 200:
-                            error_text = await response.aread()
-                            error_detail = error_text.decode()
-                            # Provide more helpful error messages
-                            if response.status_code == 401:
-                                error_detail = f"Invalid or missing Anthropic API key. Please check your ANTHROPIC_API_KEY in .env file. Original error: {error_detail}"
-                            elif response.status_code == 404:
-                                error_detail = f"Model not found. Please check the model name. Valid models: claude-3-5-sonnet-20240620, claude-3-opus-20240229, claude-3-sonnet-20240229. Original error: {error_detail}"
-                            # Can't raise HTTPException in streaming response, so yield error instead
-                            yield f"data: {json.dumps({'type': 'error', 'message': error_detail})}\n\n"
-                            return
-                        
-                        full_response = ""
-                        input_tokens = 0
-                        output_tokens = 0
-                        _first_chunk_at = None
-                        async for line in response.aiter_lines():
-                            if line.startswith("data: "):
-                                data_str = line[6:]
-                                if data_str == "[DONE]":
-                                    break
-                                try:
-                                    data = json.loads(data_str)
-                                    event_type = data.get("type")
-                                    if event_type == "message_start":
-                                        usage = data.get("message", {}).get("usage", {})
-                                        input_tokens = usage.get("input_tokens", 0)
-                                        yield f"data: {json.dumps({'type': 'usage', 'input_tokens': input_tokens})}\n\n"
-                                    elif event_type == "content_block_delta":
-                                        chunk = data.get("delta", {}).get("text", "")
-                                        if chunk:
-                                            if _first_chunk_at is None:
-                                                _first_chunk_at = time.time()
-                                            full_response += chunk
-                                            _partial_response = full_response
-                                            yield f"data: {json.dumps({'type': 'chunk', 'content': chunk})}\n\n"
-                                    elif event_type == "message_delta":
-                                        usage = data.get("usage", {})
-                                        output_tokens = usage.get("output_tokens", 0)
-                                    elif event_type == "message_stop":
-                                        break
-                                except json.JSONDecodeError:
-                                    continue
-                        
-                        # Dynamic cost calculation
-                        from config import MODEL_PRICING
-                        model_name = req.model or "claude-3-opus"
-                        pricing = MODEL_PRICING.get(model_name)
-                        
-                        # Fallback logic if exact match fails
-                        if not pricing:
-                            for key, p in MODEL_PRICING.items():
-                                if model_name.startswith(key):
-                                    pricing = p
-                                    break
-                        
-                        # Default to Opus if still not found
-                        if not pricing:
-                            pricing = {"input": 15.0, "output": 75.0}
-
-                        cost = (input_tokens * pricing["input"] + output_tokens * pricing["output"]) / 1_000_000
-
-                        if req.scoring_session_id:
-                            ss_record_turn(req.scoring_session_id, input_tokens=input_tokens, output_tokens=output_tokens, cost=cost, user_message=user_last_msg, assistant_message=full_response)
-                            _turn_recorded = True
-                            if _first_chunk_at is not None and model not in ["gpt-5.2-reasoning", "grok-4-1-fast-reasoning"]:
-                                latency = _first_chunk_at - _ss_start
-                                ss_record_processing_time(req.scoring_session_id, latency)
-
-                        yield f"data: {json.dumps({'type': 'done', 'content': full_response, 'input_tokens': input_tokens, 'output_tokens': output_tokens, 'cost': cost})}\n\n"
-            elif use_xai:
-                # Use xAI API for Grok models (OpenAI-compatible)
-                conversation_history = []
-                current_prompt = ""
-                
-                for msg in anthropic_messages:
-                    if msg["role"] == "user":
-                        if current_prompt:
-                            conversation_history.append({"role": "user", "content": current_prompt})
-                        current_prompt = msg["content"]
-                    elif msg["role"] == "assistant":
-                        if current_prompt:
-                            conversation_history.append({"role": "user", "content": current_prompt})
-                            current_prompt = ""
-                        conversation_history.append({"role": "assistant", "content": msg["content"]})
-                
-                xai_llm = LLM(
-                    base_url=settings.xai_base_url,
-                    api_key=settings.xai_api_key,
-                    model=model,
-                    system_prompt=system_message,
-                )
-                
-                full_response = ""
-                _first_chunk_at = None
-                async for chunk in xai_llm.stream(
-                    current_prompt,
-                    conversation_history=conversation_history if conversation_history else None,
-                    include_usage=True,
-                ):
-                    if _first_chunk_at is None:
-                        _first_chunk_at = time.time()
-                    full_response += chunk
-                    _partial_response = full_response
-                    yield f"data: {json.dumps({'type': 'chunk', 'content': chunk})}\n\n"
-                
-                usage = xai_llm.last_usage
-                print(f"DEBUG [xAI]: usage={usage}")
-                if usage:
-                    input_tokens = usage["prompt_tokens"]
-                    output_tokens = usage["completion_tokens"] + usage.get("completion_tokens_details", {}).get("reasoning_tokens", 0)
-                else:
-                    input_tokens = len(current_prompt.split()) * 2
-                    output_tokens = len(full_response.split()) * 2
-
-                yield f"data: {json.dumps({'type': 'usage', 'input_tokens': input_tokens})}\n\n"
-
-                from config import MODEL_PRICING
-                pricing = MODEL_PRICING.get(model)
-                if not pricing:
-                    for key, p in MODEL_PRICING.items():
-                        if model.startswith(key):
-                            pricing = p
-                            break
-                if not pricing:
-                    pricing = {"input": 0.20, "output": 0.50}
-
-                cost = (input_tokens * pricing["input"] + output_tokens * pricing["output"]) / 1_000_000
-
-                if req.scoring_session_id:
-                    ss_record_turn(req.scoring_session_id, input_tokens=input_tokens, output_tokens=output_tokens, cost=cost, user_message=user_last_msg, assistant_message=full_response)
-                    _turn_recorded = True
-                    if _first_chunk_at is not None and model not in ["gpt-5.2-reasoning", "grok-4-1-fast-reasoning"]:
-                        latency = _first_chunk_at - _ss_start
-                        ss_record_processing_time(req.scoring_session_id, latency)
+                client = get_shared_http_client()
+                headers = {
+                    "x-api-key": settings.anthropic_api_key,
+                    "anthropic-version": "2023-06-01",
+                    "content-type": "application/json",
+                }
 
-                yield f"data: {json.dumps({'type': 'done', 'content': full_response, 'input_tokens': input_tokens, 'output_tokens': output_tokens, 'cost': cost})}\n\n"
-            elif use_perplexity:
-                # Use Perplexity Sonar API (OpenAI-compatible)
-                conversation_history = []
-                current_prompt = ""
-                for msg in anthropic_messages:
-                    if msg["role"] == "user":
-                        if current_prompt:
-                            conversation_history.append({"role": "user", "content": current_prompt})
-                        current_prompt = msg["content"]
-                    elif msg["role"] == "assistant":
-                        if current_prompt:
-                            conversation_history.append({"role": "user", "content": current_prompt})
-                            current_prompt = ""
-                        conversation_history.append({"role": "assistant", "content": msg["content"]})
-                perplexity_llm = LLM(
-                    base_url=settings.perplexity_base_url,
-                    api_key=settings.perplexity_api_key,
-                    model=model,
-                    system_prompt=system_message,
-                )
-                full_response = ""
-                _first_chunk_at = None
-                async for chunk in perplexity_llm.stream(
-                    current_prompt,
-                    conversation_history=conversation_history if conversation_history else None,
-                    include_usage=True,
-                ):
-                    if _first_chunk_at is None:
-                        _first_chunk_at = time.time()
-                    full_response += chunk
-                    _partial_response = full_response
-                    yield f"data: {json.dumps({'type': 'chunk', 'content': chunk})}\n\n"
+                payload = {
+                    "model": model,
+                    "max_tokens": settings.max_tokens,
+                    "messages": _anthropic_cached_messages(anthropic_messages),
+                    "system": _anthropic_cached_system(system_message),
+                    "stream": True,
+                }
                 
-                usage = perplexity_llm.last_usage
-                print(f"DEBUG [Perplexity]: usage={usage}")
-                if usage:
-                    input_tokens = usage["prompt_tokens"]
-                    output_tokens = usage["completion_tokens"]
-                else:
-                    input_tokens = len(current_prompt.split()) * 2
-                    output_tokens = len(full_response.split()) * 2
-                yield f"data: {json.dumps({'type': 'usage', 'input_tokens': input_tokens})}\n\n"
-                from config import MODEL_PRICING
-                pricing = MODEL_PRICING.get(model)
-                if not pricing:
-                    for key, p in MODEL_PRICING.items():
-                        if model.startswith(key):
-                            pricing = p
+                async with client.stream(
+                    "POST",
+                    "https://api.anthropic.com/v1/messages",
+                    headers=headers,
+                    json=payload,
+                    timeout=_ANTHROPIC_STREAM_TIMEOUT,
+                ) as response:
+                    if response.status_code != 200:
+                        error_detail = await _read_error_body(response)
+                        # Provide more helpful error messages
+                        if response.status_code == 401:
+                            error_detail = f"Invalid or missing Anthropic API key. Please check your ANTHROPIC_API_KEY in .env file. Original error: {error_detail}"
+                        elif response.status_code == 404:
+                            error_detail = f"Model not found. Please check the model name. Valid models: claude-3-5-sonnet-20240620, claude-3-opus-20240229, claude-3-sonnet-20240229. Original error: {error_detail}"
+                        # Can't raise HTTPException in streaming response, so yield error instead
+                        yield sse_error_frame(error_detail)
+                        return
+                    
+                    full_response = ""
+                    input_tokens = 0
+                    cache_write_tokens = 0
+                    cache_read_tokens = 0
+                    output_tokens = 0
+                    _first_chunk_at = None
+                    async for event_type, data in _anthropic_stream_events(response):
+                        if event_type == "message_start":
+                            usage = data.get("message", {}).get("usage", {})
+                            cache_write_tokens = usage.get("cache_creation_input_tokens") or 0
+                            cache_read_tokens = usage.get("cache_read_input_tokens") or 0
+                            # input_tokens excludes cached prefix tokens; report the full prompt size.
+                            input_tokens = usage.get("input_tokens", 0) + cache_write_tokens + cache_read_tokens
+                            yield sse_frame({'type': 'usage', 'input_tokens': input_tokens})
+                        elif event_type == "content_block_delta":
+                            if _first_chunk_at is None:
+                                _first_chunk_at = time.monotonic()
+                            full_response += data
+                            _partial_response = full_response
+                            yield sse_chunk_frame(data)
+                        elif event_type == "message_delta":
+                            usage = data.get("usage", {})
+                            output_tokens = usage.get("output_tokens", 0)
+                        elif event_type == "message_stop":
                             break
-                if not pricing:
-                    pricing = {"input": 3.0, "output": 15.0}
-                cost = (input_tokens * pricing["input"] + output_tokens * pricing["output"]) / 1_000_000
-
-                if req.scoring_session_id:
-                    ss_record_turn(req.scoring_session_id, input_tokens=input_tokens, output_tokens=output_tokens, cost=cost, user_message=user_last_msg, assistant_message=full_response)
-                    _turn_recorded = True
-                    if _first_chunk_at is not None and model not in ["gpt-5.2-reasoning", "grok-4-1-fast-reasoning"]:
-                        latency = _first_chunk_at - _ss_start
-                        ss_record_processing_time(req.scoring_session_id, latency)
-
-                yield f"data: {json.dumps({'type': 'done', 'content': full_response, 'input_tokens': input_tokens, 'output_tokens': output_tokens, 'cost': cost})}\n\n"
+                    
+                    # Dynamic cost calculation; default to Opus rates for unknown models
+                    input_rate, output_rate = resolve_pricing(req.model or "claude-3-opus") or (15.0, 75.0)
+                    uncached_input_tokens = input_tokens - cache_write_tokens - cache_read_tokens
+                    cost = (
+                        uncached_input_tokens * input_rate
+                        + cache_write_tokens * input_rate * CACHE_WRITE_MULTIPLIER
+                        + cache_read_tokens * input_rate * CACHE_READ_MULTIPLIER
+                        + output_tokens * output_rate
+                    ) / 1_000_000
+
+                    if req.scoring_session_id:
+                        ss_record_turn(req.scoring_session_id, input_tokens=input_tokens, output_tokens=output_tokens, cost=cost, user_message=user_last_msg, assistant_message=full_response)
+                        _turn_recorded = True
+                        if _first_chunk_at is not None and model not in ["gpt-5.2-reasoning", "grok-4-1-fast-reasoning"]:
+                            latency = _first_chunk_at - _ss_start
+                            ss_record_processing_time(req.scoring_session_id, latency)
+
+                    if response_cache_key is not None and full_response:
+                        response_cache.product_chat.set(response_cache_key, full_response)
+                    yield sse_frame({'type': 'done', 'content': full_response, 'input_tokens': input_tokens, 'output_tokens': output_tokens, 'cost': cost})
             else:
-                # Use OpenAI-compatible API (e.g., OpenRouter)
-                conversation_history = []
-                current_prompt = ""
-                
-                for msg in anthropic_messages:
-                    if msg["role"] == "user":
-                        if current_prompt:
-                            conversation_history.append({"role": "user", "content": current_prompt})
-                        current_prompt = msg["content"]
-                    elif msg["role"] == "assistant":
-                        if current_prompt:
-                            conversation_history.append({"role": "user", "content": current_prompt})
-                            current_prompt = ""
-                        conversation_history.append({"role": "assistant", "content": msg["content"]})
-                
-                if not settings.openai_api_key:
-                    raise ValueError("OPENAI_API_KEY is not set. Please configure it in your .env file.")
-                
-                claude_llm = LLM(
-                    base_url=settings.openai_base_url,
-                    api_key=settings.openai_api_key,
+                # OpenAI-compatible APIs (xAI Grok, Perplexity Sonar, OpenAI)
+                provider = _OPENAI_COMPATIBLE_PROVIDERS[
+                    "xai" if use_xai else "perplexity" if use_perplexity else "openai"
+                ]
+                conversation_history, current_prompt = _to_openai_messages(anthropic_messages)
+
+                if not provider.api_key:
+                    raise ValueError(f"{provider.api_key_setting.upper()} is not set. Please configure it in your .env file.")
+
+                provider_llm = LLM(
+                    base_url=provider.base_url,
+                    api_key=provider.api_key,
                     model=model,
                     system_prompt=system_message,
                 )
-                
+
                 full_response = ""
                 _first_chunk_at = None
-                temperature = None
-                
-                async for chunk in claude_llm.stream(
+                async for chunk in provider_llm.stream(
                     current_prompt,
                     conversation_history=conversation_history if conversation_history else None,
-                    temperature=temperature,
                     include_usage=True,
                 ):
                     if _first_chunk_at is None:
-                        _first_chunk_at = time.time()
+                        _first_chunk_at = time.monotonic()
                     full_response += chunk
                     _partial_response = full_response
-                    yield f"data: {json.dumps({'type': 'chunk', 'content': chunk})}\n\n"
-                
-                usage = claude_llm.last_usage
-                print(f"DEBUG [OpenAI]: usage={usage}")
+                    yield sse_chunk_frame(chunk)
+
+                usage = provider_llm.last_usage
+                print(f"DEBUG [{provider.label}]: usage={usage}")
                 if usage:
                     input_tokens = usage["prompt_tokens"]
                     output_tokens = usage["completion_tokens"]
+                    if provider.bills_reasoning_tokens:
+                        output_tokens += (usage.get("completion_tokens_details") or {}).get("reasoning_tokens") or 0
                 else:
-                    input_tokens = len(current_prompt.split()) * 2
-                    output_tokens = len(full_response.split()) * 2
+                    input_tokens = estimate_tokens(current_prompt)
+                    output_tokens = estimate_tokens(full_response)
 
-                yield f"data: {json.dumps({'type': 'usage', 'input_tokens': input_tokens})}\n\n"
+                yield sse_frame({'type': 'usage', 'input_tokens': input_tokens})
 
-                from config import MODEL_PRICING
-                pricing = MODEL_PRICING.get(model)
-                if not pricing:
-                     for key, p in MODEL_PRICING.items():
-                        if model.startswith(key):
-                            pricing = p
-                            break
-                if not pricing:
-                    pricing = {"input": 0.0, "output": 0.0}
-
-                cost = (input_tokens * pricing["input"] + output_tokens * pricing["output"]) / 1_000_000
+                input_rate, output_rate = resolve_pricing(model) or provider.fallback_pricing
+                cost = (input_tokens * input_rate + output_tokens * output_rate) / 1_000_000
 
                 if req.scoring_session_id:
                     ss_record_turn(req.scoring_session_id, input_tokens=input_tokens, output_tokens=output_tokens, cost=cost, user_message=user_last_msg, assistant_message=full_response)
@@ -1505,14 +1677,16 @@ async def chat_stream(req: ChatRequest, request: Request, user_id: str = Depends
                         latency = _first_chunk_at - _ss_start
                         ss_record_processing_time(req.scoring_session_id, latency)
 
-                yield f"data: {json.dumps({'type': 'done', 'content': full_response, 'input_tokens': input_tokens, 'output_tokens': output_tokens, 'cost': cost})}\n\n"
+                if response_cache_key is not None and full_response:
+                    response_cache.product_chat.set(response_cache_key, full_response)
+                yield sse_frame({'type': 'done', 'content': full_response, 'input_tokens': input_tokens, 'output_tokens': output_tokens, 'cost': cost})
         except Exception as e:
             error_msg = str(e)
             if "401" in error_msg or "API key" in error_msg or "authentication" in error_msg.lower():
                 error_msg = f"Authentication failed: {error_msg}. Please check your API key configuration in .env file."
             elif "404" in error_msg or "not found" in error_msg.lower():
                 error_msg = f"Model not found: {error_msg}. Please check the model name."
-            yield f"data: {json.dumps({'type': 'error', 'message': error_msg})}\n\n"
+            yield sse_error_frame(error_msg)
         finally:
             if req.scoring_session_id and not _turn_recorded and _partial_response:
                 ss_record_partial_turn(
@@ -1544,9 +1718,10 @@ async def create_sandbox_endpoint(user_id: str = Depends(get_current_user)):
     try:
         sandbox_id = await create_sandbox()
         return {"sandbox_id": sandbox_id}
+    except SandboxCapacityError as e:
+        raise HTTPException(status_code=503, detail=f"{e}; try again shortly")
     except Exception as e:
-        logging.error(f"Sandbox creation failed: {type(e).__name__}: {e}")
-        logging.error(traceback.format_exc())
+        logging.exception("Sandbox creation failed: %s: %s", type(e).__name__, e)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to create Modal sandbox: {type(e).__name__}: {e}",
@@ -1607,18 +1782,20 @@ async def run_tests(req: RunTestsRequest, request: Request, user_id: str = Depen
     if not challenge.test_suite:
         raise HTTPException(status_code=400, detail="Challenge has no test suite")
 
-    _test_start = time.time()
-    test_dicts = [t.model_dump() for t in challenge.test_suite]
+    _test_start = time.monotonic()
+    test_dicts = get_test_suite_dicts(challenge.id)
     try:
         raw_results = await run_function_tests_detailed(req.sandbox_id, req.code, test_dicts)
     except RuntimeError as e:
         raise HTTPException(status_code=500, detail=str(e))
     finally:
         if req.scoring_session_id:
-            ss_record_processing_time(req.scoring_session_id, time.time() - _test_start)
+            ss_record_processing_time(req.scoring_session_id, time.monotonic() - _test_start)
 
-    results = [TestCaseResult(**r) for r in raw_results]
-    passed_count = sum(1 for r in results if r.passed)
+    # Sandbox results already have TestCaseResult's shape, and the response
+    # model is validated on the way out, so skip per-item validation here.
+    passed_count = sum(map(itemgetter("passed"), raw_results))
+    results = [TestCaseResult.model_construct(**r) for r in raw_results]
 
     if req.scoring_session_id:
         session = await aget_scoring_session(req.scoring_session_id)
@@ -1644,8 +1821,13 @@ async def run_tests(req: RunTestsRequest, request: Request, user_id: str = Depen
 
 
 @app.get("/api/health")
-async def health():
-    return {"status": "ok", "model": settings.default_model}
+async def health() -> dict:
+    return {
+        "status": "ok",
+        "model": settings.default_model,
+        "ui_evaluation_cache": response_cache.ui_evaluation.stats(),
+        "research_cache": response_cache.research_insights.stats(),
+    }
 
 
 class EvaluateUIRequest(BaseModel):
@@ -1658,26 +1840,126 @@ class EvaluateUIResponse(BaseModel):
     similarity_score: float  # 0-1
     detailed_feedback: str | None = None
 
+# Lower temperature for more consistent evaluation (and cacheable scores).
+_UI_JUDGE_TEMPERATURE = 0.3
+
+# Bounds outbound judge calls from evaluate-ui and prompt-feedback.
+_judge_semaphore = asyncio.Semaphore(settings.max_concurrent_judge_calls)
+_HTML_COMMENT_RE = re.compile(r'<!--.*?-->', re.DOTALL)
+
+
+def _normalize_html(html: str) -> str:
+    """HTML without comments and with whitespace runs collapsed, for equality checks."""
+    return " ".join(_HTML_COMMENT_RE.sub("", html).split())
+
+
+# Reference pages are the same str objects on every request (see
+# _REFERENCE_HTML_CACHE), so their hash is cached and lookups are cheap.
+_normalized_reference_html = lru_cache(maxsize=64)(_normalize_html)
+
+
+# Submissions larger than this are rejected outright (413).
+_UI_EVAL_MAX_SUBMISSION_CHARS = 500_000
+# HTML tokenizes denser than prose: tags, attributes and entities come out
+# closer to ~3 chars per token than the usual ~4.
+_HTML_CHARS_PER_TOKEN = 3
+_HTML_TRUNCATION_MARKER = "\n<!-- truncated -->"
+
+
+def _fit_html_to_token_budget(reference: str, generated: str, max_tokens: int) -> tuple[str, str]:
+    """Trim the generated page so both together fit in *max_tokens*.
+
+    The reference is the grading target and is always kept whole; only the
+    submission is cut, to whatever budget the reference leaves.
+    """
+    budget = max_tokens * _HTML_CHARS_PER_TOKEN
+    generated_limit = max(budget - len(reference), 0)
+    if len(generated) > generated_limit:
+        generated = generated[:generated_limit] + _HTML_TRUNCATION_MARKER
+    return reference, generated
+
+
+# Judge replies past this size are parsed in a worker thread so a huge or
+# runaway reply can't stall the event loop.
+_JSON_OFFLOAD_CHARS = 64 * 1024
+
+
+async def _parse_judge_json(text: str) -> Any:
+    """Parse a judge reply's JSON, off the event loop when it is large."""
+    if len(text) > _JSON_OFFLOAD_CHARS:
+        return await asyncio.to_thread(from_json, text)
+    return from_json(text)
+
+
+# Last resort when the judge reply isn't valid JSON: its first number.
+_SCORE_FALLBACK_RE = re.compile(r'(\d+(?:\.\d+)?)')
+
+
+async def _stream_first_json_object(chunks: AsyncIterator[str]) -> tuple[str, str | None]:
+    """
+    Consume a streamed judge reply until its first top-level JSON object closes.
+
+    Returns (text read so far, object text or None). Braces inside JSON strings
+    are ignored, and each chunk is scanned once, so code fences or prose around
+    the object need no regex pass. Anything the model writes after the object
+    is never read.
+    """
+    parts: list[str] = []
+    seen = 0  # chars in parts
+    start = -1
+    depth = 0
+    in_string = escaped = False
+    async for chunk in chunks:
+        offset = seen
+        parts.append(chunk)
+        seen += len(chunk)
+        i = 0
+        if start < 0:
+            i = chunk.find("{")
+            if i < 0:
+                continue
+            start = offset + i
+        for i in range(i, len(chunk)):
+            c = chunk[i]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif c == "\\":
+                    escaped = True
+                elif c == '"':
+                    in_string = False
+            elif c == '"':
+                in_string = True
+            elif c == "{":
+                depth += 1
+            elif c == "}":
+                depth -= 1
+                if depth == 0:
+                    text = "".join(parts)
+                    return text, text[start:offset + i + 1]
+    return "".join(parts), None
+
+
 @app.post("/api/evaluate-ui")
 @limiter.limit("3/minute")
 async def evaluate_ui(req: EvaluateUIRequest, request: Request, user_id: str = Depends(get_current_user)) -> EvaluateUIResponse:
     """Evaluate UI challenge by comparing generated HTML with challenge reference HTML code."""
-    print(f"\n{'='*60}")
-    print(f"[UI Evaluation] ===== EVALUATION REQUEST RECEIVED =====")
-    print(f"[UI Evaluation] Challenge ID: {req.challenge_id}")
-    print(f"[UI Evaluation] Generated HTML length: {len(req.generated_html)} characters")
-    print(f"{'='*60}\n")
-    
-    logger.info(f"[UI Evaluation] Received request for challenge: {req.challenge_id}")
-    logger.info(f"[UI Evaluation] Generated HTML length: {len(req.generated_html)} characters")
+    generated_len = len(req.generated_html)
+    logger.info(
+        "[UI Evaluation] Received request for challenge %s (%d chars of HTML)",
+        req.challenge_id, generated_len,
+    )
     
+    if generated_len > _UI_EVAL_MAX_SUBMISSION_CHARS:
+        raise HTTPException(status_code=413, detail="Generated HTML is too large to evaluate")
+
     challenge = get_challenge_by_id(req.challenge_id)
     if challenge is None:
-        logger.error(f"[UI Evaluation] Challenge not found: {req.challenge_id}")
+        logger.error("[UI Evaluation] Challenge not found: %s", req.challenge_id)
         raise HTTPException(status_code=404, detail="Challenge not found")
     
     if challenge.category != "UI":
-        logger.error(f"[UI Evaluation] Challenge is not UI category: {challenge.category}")
+        logger.error("[UI Evaluation] Challenge is not UI category: %s", challenge.category)
         raise HTTPException(status_code=400, detail="Challenge is not a UI challenge")
     
     if not challenge.html_url:
@@ -1687,29 +1969,43 @@ async def evaluate_ui(req: EvaluateUIRequest, request: Request, user_id: str = D
             detail="Challenge must have html_url for UI evaluation"
         )
     
-    logger.info(f"[UI Evaluation] Challenge found: {challenge.title}")
-    logger.info(f"[UI Evaluation] Using HTML code comparison method")
+    logger.debug("[UI Evaluation] Challenge found: %s", challenge.title)
     
     try:
         # Load reference HTML from challenge's html_url
-        from pathlib import Path
-        project_root = Path(__file__).parent.parent
-        html_path = project_root / challenge.html_url
-        
-        if not html_path.exists():
+        try:
+            reference_html, reference_digest = await _load_reference_html(challenge.html_url)
+        except FileNotFoundError:
             raise HTTPException(
                 status_code=404,
                 detail=f"Reference HTML file not found: {challenge.html_url}"
             )
         
-        with open(html_path, "r", encoding="utf-8") as f:
-            reference_html = f.read()
-        
-        logger.info(f"[UI Evaluation] Reference HTML loaded ({len(reference_html)} characters)")
-        logger.info(f"[UI Evaluation] Generated HTML length: {len(req.generated_html)} characters")
+        logger.debug("[UI Evaluation] Reference HTML loaded (%d characters)", len(reference_html))
+
+        # A copy of the reference (ignoring comments and whitespace) needs no judge.
+        if _normalize_html(req.generated_html) == _normalized_reference_html(reference_html):
+            logger.info("[UI Evaluation] Submission matches the reference exactly")
+            return EvaluateUIResponse(
+                score=100.0,
+                similarity_score=1.0,
+                detailed_feedback="Exact match: the generated HTML is identical to the reference.",
+            )
+
+        # Same reference, submission and judge settings -> reuse the earlier score.
+        eval_cache_key = response_cache.cache_key(
+            req.challenge_id, reference_digest, req.generated_html, settings.judge_model, _UI_JUDGE_TEMPERATURE,
+        )
+        cached = response_cache.ui_evaluation.get(eval_cache_key, settings.ui_evaluation_cache_seconds)
+        if cached is not None:
+            score, reasoning = cached
+            logger.info("[UI Evaluation] Cache hit. Score: %.1f/100", score)
+            return EvaluateUIResponse(score=score, similarity_score=score / 100.0, detailed_feedback=reasoning)
         
         # Use OpenAI to compare the HTML codes
-        from llm import LLM
+        prompt_reference_html, prompt_generated_html = _fit_html_to_token_budget(
+            reference_html, req.generated_html, settings.ui_evaluation_max_html_tokens,
+        )
         
         evaluation_prompt = f"""You are a kind and generous scoring expert when it comes to evaluating HTML code similarity. Compare the reference HTML code with the generated HTML code and provide a similarity score between 0-100.
 
@@ -1721,12 +2017,12 @@ Consider the following aspects when evaluating:
 
 **Reference HTML Code:**
 ```html
-{reference_html}
+{prompt_reference_html}
 ```
 
 **Generated HTML Code:**
 ```html
-{req.generated_html}
+{prompt_generated_html}
 ```
 
 **Challenge Description:**
@@ -1744,48 +2040,28 @@ Be thorough in your evaluation. A score of 100 means the codes are essentially i
         llm = _create_judge_llm(
             model=settings.judge_model,
             system_prompt="You are an expert HTML/CSS/JavaScript evaluator. Provide accurate and detailed similarity assessments.",
-            temperature=0.3,  # Lower temperature for more consistent evaluation
+            temperature=_UI_JUDGE_TEMPERATURE,
         )
         
-        logger.info("[UI Evaluation] Calling judge model for HTML comparison...")
-        print(f"[UI Evaluation] Calling judge model: {settings.judge_model}")
-        print(f"[UI Evaluation] Prompt length: {len(evaluation_prompt)} characters")
-        
-        response = await llm.generate(evaluation_prompt)
-        response_text = response.response_text.strip()
+        logger.info(
+            "[UI Evaluation] Calling judge model %s (prompt %d chars)",
+            settings.judge_model, len(evaluation_prompt),
+        )
         
-        # Log the full response for debugging
-        print(f"[UI Evaluation] Judge API response received:")
-        print(f"[UI Evaluation] Response length: {len(response_text)} characters")
-        print(f"[UI Evaluation] Full response text:\n{response_text}")
-        logger.info(f"[UI Evaluation] Judge API response received ({len(response_text)} chars)")
-        logger.info(f"[UI Evaluation] Full response: {response_text}")
+        async with _judge_semaphore, aclosing(llm.stream(evaluation_prompt)) as chunks:
+            response_text, json_str = await _stream_first_json_object(chunks)
+        response_text = response_text.strip()
         
-        # Extract JSON from response (might be wrapped in markdown code block)
-        json_match = None
-        # Try to find JSON in code blocks first
-        json_pattern = r'```(?:json)?\s*(\{.*?\})\s*```'
-        json_match = re.search(json_pattern, response_text, re.DOTALL)
-        if json_match:
-            json_str = json_match.group(1)
-            print(f"[UI Evaluation] Found JSON in code block")
-        else:
-            # Try to find JSON object directly
-            json_pattern = r'\{.*?\}'
-            json_match = re.search(json_pattern, response_text, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(0)
-                print(f"[UI Evaluation] Found JSON object directly")
-            else:
-                # Fallback: try to parse the whole response
-                json_str = response_text
-                print(f"[UI Evaluation] Using entire response as JSON")
+        logger.info("[UI Evaluation] Judge API response received (%d chars)", len(response_text))
+        logger.debug("[UI Evaluation] Full response: %s", response_text)
         
-        print(f"[UI Evaluation] Extracted JSON string length: {len(json_str)} characters")
-        print(f"[UI Evaluation] Extracted JSON (first 500 chars): {json_str[:500]}")
+        if json_str is None:
+            # No complete object: try to parse the whole response
+            json_str = response_text
+            logger.debug("[UI Evaluation] No JSON object found; parsing entire response")
         
         try:
-            evaluation_result = json.loads(json_str)
+            evaluation_result = await _parse_judge_json(json_str)
             score = float(evaluation_result.get("score", 0))
             reasoning = evaluation_result.get("reasoning", "No reasoning provided")
             
@@ -1793,34 +2069,28 @@ Be thorough in your evaluation. A score of 100 means the codes are essentially i
             score = max(0, min(100, score))
             similarity_score = score / 100.0  # Convert to 0-1 range
             
-            print(f"[UI Evaluation] ========================================")
-            print(f"[UI Evaluation] Evaluation Result:")
-            print(f"[UI Evaluation] Score: {score:.1f}/100")
-            print(f"[UI Evaluation] Similarity: {similarity_score:.4f}")
-            print(f"[UI Evaluation] Reasoning: {reasoning}")
-            print(f"[UI Evaluation] ========================================")
-            
-            logger.info(f"[UI Evaluation] Comparison completed. Score: {score:.1f}/100")
-            logger.info(f"[UI Evaluation] Similarity: {similarity_score:.4f}")
-            logger.info(f"[UI Evaluation] Full reasoning: {reasoning}")
-            
+            logger.info(
+                "[UI Evaluation] Comparison completed. Score: %.1f/100, similarity: %.4f",
+                score, similarity_score,
+            )
+            logger.debug("[UI Evaluation] Full reasoning: %s", reasoning)
+
+            response_cache.ui_evaluation.set(eval_cache_key, (score, reasoning))
+
             return EvaluateUIResponse(
                 score=score,
                 similarity_score=similarity_score,
                 detailed_feedback=reasoning,
             )
-        except json.JSONDecodeError as e:
-            print(f"[UI Evaluation] ERROR: Failed to parse JSON from response")
-            print(f"[UI Evaluation] JSONDecodeError: {e}")
-            print(f"[UI Evaluation] Response text (first 1000 chars): {response_text[:1000]}")
-            logger.error(f"[UI Evaluation] Failed to parse JSON from response: {e}")
-            logger.error(f"[UI Evaluation] Response text: {response_text[:1000]}")
+        except ValueError as e:
+            logger.error("[UI Evaluation] Failed to parse JSON from response: %s", e)
+            logger.error("[UI Evaluation] Response text: %s", response_text[:1000])
             # Fallback: try to extract score from text
-            score_match = re.search(r'(\d+(?:\.\d+)?)', response_text)
+            score_match = _SCORE_FALLBACK_RE.search(response_text)
             if score_match:
                 score = float(score_match.group(1))
                 score = max(0, min(100, score))
-                print(f"[UI Evaluation] Fallback: Extracted score from text: {score}")
+                logger.warning("[UI Evaluation] Fallback: extracted score from text: %s", score)
                 return EvaluateUIResponse(
                     score=score,
                     similarity_score=score / 100.0,
@@ -1834,11 +2104,7 @@ Be thorough in your evaluation. A score of 100 means the codes are essentially i
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[UI Evaluation] ERROR: Exception occurred: {e}")
-        print(f"[UI Evaluation] Exception type: {type(e).__name__}")
-        import traceback
-        print(f"[UI Evaluation] Traceback:\n{traceback.format_exc()}")
-        logger.error(f"UI evaluation failed: {e}", exc_info=True)
+        logger.error("UI evaluation failed: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to evaluate UI: {str(e)}"
@@ -1895,6 +2161,22 @@ PROMPT_FEEDBACK_PRD_SYSTEM_PROMPT = (
 )
 
 
+@lru_cache(maxsize=1)
+def _research_llm() -> LLM:
+    """Perplexity Sonar client for PRD research (static config, built once)."""
+    return LLM(
+        base_url=settings.perplexity_base_url,
+        api_key=settings.perplexity_api_key,
+        model="sonar-pro",
+        system_prompt=(
+            "You are a research assistant. Given a business problem statement, search for and summarize "
+            "5–7 key industry insights, regulatory considerations, best practices, or factual points that "
+            "would strengthen a Product Requirements Document addressing this problem. Be concise; use "
+            "bullet points. Cite only the most relevant points. Output plain text bullets, no preamble."
+        ),
+    )
+
+
 async def _fetch_research_insights(problem_statement: str) -> str:
     """
     Use Perplexity Sonar API to search the problem statement and return key research
@@ -1903,45 +2185,26 @@ async def _fetch_research_insights(problem_statement: str) -> str:
     """
     if not (problem_statement or "").strip() or not settings.perplexity_api_key:
         return ""
+    statement = problem_statement.strip()[:4000]
+    cache_key = response_cache.cache_key(statement)
+    cached = response_cache.research_insights.get(cache_key, settings.research_cache_seconds)
+    if cached is not None:
+        return cached
     try:
-        research_llm = LLM(
-            base_url=settings.perplexity_base_url,
-            api_key=settings.perplexity_api_key,
-            model="sonar-pro",
-            system_prompt=(
-                "You are a research assistant. Given a business problem statement, search for and summarize "
-                "5–7 key industry insights, regulatory considerations, best practices, or factual points that "
-                "would strengthen a Product Requirements Document addressing this problem. Be concise; use "
-                "bullet points. Cite only the most relevant points. Output plain text bullets, no preamble."
-            ),
-        )
-        response = await research_llm.generate(
-            f"Problem statement:\n\n{problem_statement.strip()[:4000]}",
+        response = await _research_llm().generate(
+            f"Problem statement:\n\n{statement}",
             temperature=0.3,
         )
-        return (response.response_text or "").strip()
     except Exception as e:
         logger.warning("Perplexity research fetch failed: %s", e)
         return ""
+    insights = (response.response_text or "").strip()
+    if insights:
+        response_cache.research_insights.set(cache_key, insights)
+    return insights
 
 
-def _build_prd_feedback_prompt(req: PromptFeedbackRequest, research_insights: str = "") -> str:
-    """Build the analysis prompt for product/PRD challenges: grade PRD on feasibility, expertise, etc."""
-    prd_text = (req.prd_content or "")[:8000]
-    if len(req.prd_content or "") > 8000:
-        prd_text += "\n\n... (truncated)"
-
-    conversation_text = ""
-    if req.messages:
-        conversation_text = "\n\n".join(
-            f"**{msg.role.upper()}:** {msg.content[:2000]}{'...' if len(msg.content) > 2000 else ''}"
-            for msg in req.messages
-        )
-    else:
-        conversation_text = "(No discovery conversation provided.)"
-
-    research_section = ""
-    score_instructions = """### Summary
+_PRD_SCORE_HEADINGS = """### Summary
 (No score here — one sentence only.)
 
 ### Feasibility (N)
@@ -1956,25 +2219,55 @@ def _build_prd_feedback_prompt(req: PromptFeedbackRequest, research_insights: st
 ### Alignment with Discovery (N)
 (One sentence. N = 0–10.)"""
 
-    if research_insights.strip():
-        research_section = f"""
-## Key research insights (from web search)
-The following points are relevant industry/regulatory/best-practice insights for this problem. Use them to evaluate how well the PRD incorporates research.
-
-{research_insights.strip()[:3000]}
-"""
-        score_instructions += """
+_PRD_RESEARCH_HEADING = """
 
 ### Research (N)
 (One sentence. How well did the PRD incorporate the key research insights above? N = 0–10.)"""
 
-    score_instructions += """
+_PRD_IMPROVEMENT_HEADING = """
 
 ### One improvement
 (No score — one sentence.)
 """
-    total_note = "Total score = (sum of the five dimension scores) × 100 ÷ 50, so total is out of 100." if research_insights.strip() else "Total score = (sum of the four dimension scores) × 10 ÷ 4, so total is out of 100."
-    score_instructions += f"\n{total_note} Use strict 0–10 for each dimension."
+
+# The two possible score sections, built once: with or without a Research dimension.
+_PRD_SCORE_INSTRUCTIONS = (
+    _PRD_SCORE_HEADINGS + _PRD_IMPROVEMENT_HEADING
+    + "\nTotal score = (sum of the four dimension scores) × 10 ÷ 4, so total is out of 100."
+    + " Use strict 0–10 for each dimension."
+)
+_PRD_SCORE_INSTRUCTIONS_WITH_RESEARCH = (
+    _PRD_SCORE_HEADINGS + _PRD_RESEARCH_HEADING + _PRD_IMPROVEMENT_HEADING
+    + "\nTotal score = (sum of the five dimension scores) × 100 ÷ 50, so total is out of 100."
+    + " Use strict 0–10 for each dimension."
+)
+
+
+def _build_prd_feedback_prompt(req: PromptFeedbackRequest, research_insights: str = "") -> str:
+    """Build the analysis prompt for product/PRD challenges: grade PRD on feasibility, expertise, etc."""
+    prd_content = req.prd_content or ""
+    prd_text = prd_content[:8000]
+    if len(prd_content) > 8000:
+        prd_text += "\n\n... (truncated)"
+
+    conversation_text = ""
+    if req.messages:
+        conversation_text = "\n\n".join(
+            f"**{msg.role.upper()}:** {msg.content[:2000]}{'...' if len(msg.content) > 2000 else ''}"
+            for msg in req.messages
+        )
+    else:
+        conversation_text = "(No discovery conversation provided.)"
+
+    research_section = ""
+    if research_insights.strip():
+        research_section = f"""
+## Key research insights (from web search)
+The following points are relevant industry/regulatory/best-practice insights for this problem. Use them to evaluate how well the PRD incorporates research.
+
+{research_insights.strip()[:3000]}
+"""
+    score_instructions = _PRD_SCORE_INSTRUCTIONS_WITH_RESEARCH if research_section else _PRD_SCORE_INSTRUCTIONS
 
     return f"""Evaluate this Product Requirements Document (PRD) and the discovery conversation that preceded it.
 
@@ -2002,15 +2295,18 @@ Reply in **markdown**. For each dimension, give a score 0–10 in parentheses in
 """
 
 
+_PRD_SECTION_RE = re.compile(
+    r"^###\s+(Feasibility|Expertise|Clarity\s*&\s*Actionability|Alignment with Discovery|Research)\s*\((\d+)\)",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+
 def _parse_prd_section_scores(text: str) -> tuple[list[tuple[str, int]], int]:
     """Parse ### Dimension (N) lines. Four dimensions: total = sum × 10 ÷ 4. Five (with Research): total = sum × 100 ÷ 50."""
-    pattern = re.compile(
-        r"^###\s+(Feasibility|Expertise|Clarity\s*&\s*Actionability|Alignment with Discovery|Research)\s*\((\d+)\)",
-        re.IGNORECASE | re.MULTILINE,
-    )
-    matches = pattern.findall(text)
+    # At most five dimensions exist; stop scanning once they are all found.
     scores: list[tuple[str, int]] = []
-    for name, num_str in matches:
+    for match in islice(_PRD_SECTION_RE.finditer(text), 5):
+        name, num_str = match.groups()
         n = min(10, max(0, int(num_str)))
         scores.append((name.strip(), n))
     total_raw = sum(s for _, s in scores)
@@ -2040,6 +2336,10 @@ def _append_prd_score_block(feedback_text: str) -> str:
     return feedback_text + "".join(lines)
 
 
+# Inline styles are noise for prompt feedback; the structure is what matters.
+_STYLE_BLOCK_RE = re.compile(r'<style>.*?</style>', re.DOTALL)
+
+
 def _build_feedback_analysis_prompt(req: PromptFeedbackRequest) -> str:
     """Build the analysis prompt that evaluates the user's prompting strategy (coding) or PRD (product)."""
     if req.challenge_category == "product" and (req.prd_content or "").strip():
@@ -2058,7 +2358,7 @@ def _build_feedback_analysis_prompt(req: PromptFeedbackRequest) -> str:
     reference_section = ""
     convergence_section = ""
     if req.reference_html:
-        html_for_feedback = re.sub(r'<style>.*?</style>', '<!-- styles removed -->', req.reference_html, flags=re.DOTALL)
+        html_for_feedback = _STYLE_BLOCK_RE.sub('<!-- styles removed -->', req.reference_html)
         truncated_html = html_for_feedback[:6000]
         if len(req.reference_html) > 6000:
             truncated_html += "\n... (truncated)"
@@ -2143,18 +2443,19 @@ async def prompt_feedback(req: PromptFeedbackRequest, request: Request, user_id:
             )
 
             full_response = ""
-            async for chunk in feedback_llm.stream(
-                analysis_prompt,
-                temperature=0.4,
-            ):
-                full_response += chunk
-                yield f"data: {json.dumps({'type': 'chunk', 'content': chunk})}\n\n"
+            async with _judge_semaphore:
+                async for chunk in feedback_llm.stream(
+                    analysis_prompt,
+                    temperature=0.4,
+                ):
+                    full_response += chunk
+                    yield sse_chunk_frame(chunk)
 
             # For PRD feedback, parse section scores and append total out of 100
             if is_product_prd:
                 full_response = _append_prd_score_block(full_response)
 
-            yield f"data: {json.dumps({'type': 'done', 'content': full_response})}\n\n"
+            yield sse_frame({'type': 'done', 'content': full_response})
 
             # Persist feedback to Supabase if we have a session ID
             if db_session_id and full_response:
@@ -2166,7 +2467,7 @@ async def prompt_feedback(req: PromptFeedbackRequest, request: Request, user_id:
         except Exception as e:
             error_msg = str(e)
             logger.error(f"Prompt feedback failed: {error_msg}")
-            yield f"data: {json.dumps({'type': 'error', 'message': error_msg})}\n\n"
+            yield sse_error_frame(error_msg)
 
     return StreamingResponse(
         generate(),
@@ -0,0 +1,66 @@
+"""
+Exact-match caches for LLM results that are safe to reuse.
+
+- product_chat: chat_stream completions for product challenges. Demo and test
+  runs tend to resend identical conversations.
+- ui_evaluation: judge scores from /api/evaluate-ui. Users often resubmit the
+  same HTML, and the judge runs at low temperature.
+- research_insights: Perplexity research for PRD feedback. The input is the
+  challenge's problem statement, so every submission for a challenge shares it.
+
+PRD feedback is never reused across requests: it quotes the author's PRD.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any
+
+from pydantic_core import to_json
+
+
+def cache_key(*parts: Any) -> str:
+    """Digest of everything that determines the cached result."""
+    return hashlib.blake2b(to_json(parts), digest_size=16).hexdigest()
+
+
+class ResponseCache:
+    """In-process LRU of recent results; freshness is checked on lookup."""
+
+    def __init__(self, max_entries: int = 512) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # key -> (stored_at monotonic seconds, value), least recently used first
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str, ttl_seconds: float) -> Any | None:
+        """Cached value for *key* if it is younger than *ttl_seconds*."""
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] > ttl_seconds:
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: str, value: Any) -> None:
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+product_chat = ResponseCache()
+ui_evaluation = ResponseCache(max_entries=2048)
+research_insights = ResponseCache(max_entries=256)
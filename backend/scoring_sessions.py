@@ -6,6 +6,7 @@ a server restart), the session is lazily recovered from the DB.
 """
 
 import asyncio
+import heapq
 import logging
 import time
 import uuid
@@ -35,6 +36,11 @@ class ScoringSession(BaseModel):
 
 _scoring_sessions: dict[str, ScoringSession] = {}
 
+# (expiry time, session id) for every session added to _scoring_sessions,
+# soonest first, so cleanup only looks at sessions that are due. Entries for
+# sessions already removed are discarded when they reach the top.
+_expiry_heap: list[tuple[float, str]] = []
+
 
 # ---------------------------------------------------------------------------
 # Internal helpers
@@ -45,6 +51,11 @@ def _is_expired(session: ScoringSession) -> bool:
     return time.time() - session.started_at > SESSION_TTL_SECONDS
 
 
+def _remember(session: ScoringSession) -> None:
+    _scoring_sessions[session.id] = session
+    heapq.heappush(_expiry_heap, (session.started_at + SESSION_TTL_SECONDS, session.id))
+
+
 def _to_db_dict(session: ScoringSession) -> dict:
     """Serialise a ScoringSession to the flat dict expected by Supabase."""
     return session.model_dump()
@@ -100,14 +111,16 @@ def _delete_async(session_id: str) -> None:
 def create_scoring_session(
     challenge_id: str, username: str, model: str = "unknown"
 ) -> ScoringSession:
-    session = ScoringSession(
+    # Every field is generated here, so skip validation. Rows loaded back
+    # from the DB still go through the validating constructor.
+    session = ScoringSession.model_construct(
         id=str(uuid.uuid4()),
         challenge_id=challenge_id,
         username=username,
         model=model,
         started_at=time.time(),
     )
-    _scoring_sessions[session.id] = session
+    _remember(session)
     _persist_async(session.id)
     return session
 
@@ -135,7 +148,7 @@ def get_scoring_session(session_id: str) -> ScoringSession | None:
             return None
         if _is_expired(recovered):
             return None
-        _scoring_sessions[recovered.id] = recovered
+        _remember(recovered)
         logger.info("Rehydrated scoring session %s from Supabase", session_id[:8])
         return recovered
 
@@ -199,7 +212,7 @@ async def aget_scoring_session(session_id: str) -> ScoringSession | None:
     if _is_expired(recovered):
         return None
 
-    _scoring_sessions[recovered.id] = recovered
+    _remember(recovered)
     logger.info("Rehydrated scoring session %s from Supabase after restart", session_id[:8])
     return recovered
 
@@ -264,8 +277,9 @@ def record_partial_turn(
     if session is None or session.status != "active":
         return
     from config import MODEL_PRICING, _DEFAULT_PRICING
-    est_input = len(user_message.split()) * 2
-    est_output = len(partial_response.split()) * 2
+    from llm import estimate_tokens
+    est_input = estimate_tokens(user_message)
+    est_output = estimate_tokens(partial_response)
     pricing = MODEL_PRICING.get(model, _DEFAULT_PRICING)
     cost = (est_input * pricing["input"] + est_output * pricing["output"]) / 1_000_000
     session.total_turns += 1
@@ -298,13 +312,17 @@ def cleanup_expired_sessions() -> int:
     DB cleanup is handled automatically by pg_cron — no explicit deletes needed.
     """
     now = time.time()
-    expired_ids = [
-        sid
-        for sid, session in _scoring_sessions.items()
-        if now - session.started_at > SESSION_TTL_SECONDS
-    ]
-    for sid in expired_ids:
-        del _scoring_sessions[sid]
-    if expired_ids:
-        logger.info("Cleaned up %d expired scoring session(s) from memory", len(expired_ids))
-    return len(expired_ids)
+    removed = 0
+    while _expiry_heap and _expiry_heap[0][0] < now:
+        _, sid = heapq.heappop(_expiry_heap)
+        session = _scoring_sessions.get(sid)
+        if session is None:
+            continue
+        if now - session.started_at > SESSION_TTL_SECONDS:
+            del _scoring_sessions[sid]
+            removed += 1
+        else:
+            heapq.heappush(_expiry_heap, (session.started_at + SESSION_TTL_SECONDS, sid))
+    if removed:
+        logger.info("Cleaned up %d expired scoring session(s) from memory", removed)
+    return removed
@@ -5,38 +5,100 @@ to the frontend via SSE without circular imports.
 """
 
 import asyncio
+import weakref
+from collections import deque
 from typing import Any
 
-# session_id -> list of queues (one per connected SSE client)
-_session_queues: dict[str, list[asyncio.Queue[dict[str, Any]]]] = {}
+# Per-subscriber backlog cap. A client that stops reading can hold at most this
+# many pending events instead of growing its queue without bound.
+_QUEUE_MAXSIZE = 256
 
+# Events that are superseded by the next one of the same type and can be shed
+# under backpressure. Everything else (session_update, timer events) is kept.
+_LOSSY_EVENT_TYPES = frozenset({"token_progress"})
 
-def _queues_for(session_id: str) -> list[asyncio.Queue[dict[str, Any]]]:
+
+class _SubscriberQueue:
+    """Bounded event buffer for one subscriber that drops stale progress ticks when full.
+
+    Only the single SSE stream that owns it reads from it.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self._maxsize = maxsize
+        self._events: deque[dict[str, Any]] = deque()
+        self._ready = asyncio.Event()  # set while _events is non-empty
+
+    def empty(self) -> bool:
+        return not self._events
+
+    def offer(self, event: dict[str, Any]) -> bool:
+        """Enqueue *event* without blocking. Returns False if it was dropped."""
+        if len(self._events) >= self._maxsize and not self._evict(
+            prefer_lossy_only=event.get("type") in _LOSSY_EVENT_TYPES
+        ):
+            return False
+        self._events.append(event)
+        self._ready.set()
+        return True
+
+    def get_nowait(self) -> dict[str, Any]:
+        if not self._events:
+            raise asyncio.QueueEmpty
+        event = self._events.popleft()
+        if not self._events:
+            self._ready.clear()
+        return event
+
+    async def get(self) -> dict[str, Any]:
+        while not self._events:
+            await self._ready.wait()
+        return self.get_nowait()
+
+    def _evict(self, *, prefer_lossy_only: bool) -> bool:
+        """Remove the oldest lossy event; for non-lossy events, fall back to the oldest event."""
+        for i, queued in enumerate(self._events):
+            if queued.get("type") in _LOSSY_EVENT_TYPES:
+                del self._events[i]
+                return True
+        if prefer_lossy_only:
+            return False
+        self._events.popleft()
+        return True
+
+
+# session_id -> live subscriber queues (one per connected SSE client). Weak refs
+# so a stream that goes away without unsubscribing doesn't pin its queue.
+_session_queues: dict[str, weakref.WeakSet[_SubscriberQueue]] = {}
+
+
+def _queues_for(session_id: str) -> weakref.WeakSet[_SubscriberQueue]:
     if session_id not in _session_queues:
-        _session_queues[session_id] = []
+        _session_queues[session_id] = weakref.WeakSet()
     return _session_queues[session_id]
 
 
-def subscribe_session_events(session_id: str) -> asyncio.Queue[dict[str, Any]]:
+def subscribe_session_events(session_id: str) -> _SubscriberQueue:
     """Create a queue for this client; caller must remove it on disconnect."""
-    q: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
-    _queues_for(session_id).append(q)
+    q = _SubscriberQueue(maxsize=_QUEUE_MAXSIZE)
+    _queues_for(session_id).add(q)
     return q
 
 
-def unsubscribe_session_events(session_id: str, queue: asyncio.Queue[dict[str, Any]]) -> None:
+def unsubscribe_session_events(session_id: str, queue: _SubscriberQueue) -> None:
     """Remove the queue when client disconnects."""
-    if session_id in _session_queues:
-        try:
-            _session_queues[session_id].remove(queue)
-        except ValueError:
-            pass
+    queues = _session_queues.get(session_id)
+    if queues is None:
+        return
+    queues.discard(queue)
+    if not queues:
+        del _session_queues[session_id]
 
 
 async def broadcast_session_event(session_id: str, event: dict[str, Any]) -> None:
     """Push an event to all clients subscribed to this session (e.g. agent run page)."""
-    for q in _queues_for(session_id)[:]:
-        try:
-            q.put_nowait(event)
-        except asyncio.QueueFull:
-            pass
+    queues = _session_queues.get(session_id)
+    if not queues:
+        return
+    for q in list(queues):
+        q.offer(event)
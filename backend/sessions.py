@@ -4,7 +4,8 @@ import time
 import uuid
 from typing import Any
 
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
+from pydantic_core import to_json
 
 
 class Turn(BaseModel):
@@ -43,6 +44,29 @@ class Session(BaseModel):
     composite_score: float | None = None
     final_code: str = ""
     username: str = "anonymous"
+    # user/assistant message pairs for `turns`, extended as turns are added
+    _history: list[dict] = PrivateAttr(default_factory=list)
+    # the same messages, each pre-encoded as JSON
+    _history_json: list[bytes] = PrivateAttr(default_factory=list)
+
+    def history(self) -> list[dict]:
+        """Conversation history as chat messages (two per turn).
+
+        Only turns added since the last call are converted, so the cost per
+        prompt stays constant as the session grows. Callers must not mutate
+        the returned list.
+        """
+        for turn in self.turns[len(self._history) // 2:]:
+            self._history.append({"role": "user", "content": turn.prompt_text})
+            self._history.append({"role": "assistant", "content": turn.response_text})
+        return self._history
+
+    def history_json(self) -> list[bytes]:
+        """``history()`` with each message encoded as JSON, also built incrementally."""
+        history = self.history()
+        for msg in history[len(self._history_json):]:
+            self._history_json.append(to_json(msg))
+        return self._history_json
 
 
 class LeaderboardEntry(BaseModel):
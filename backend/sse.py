@@ -0,0 +1,31 @@
+"""
+Server-Sent Events frame encoding shared by the streaming endpoints.
+
+Frames are bytes so StreamingResponse passes them through without
+re-encoding, and JSON is serialized with pydantic_core rather than stdlib json.
+"""
+
+from pydantic_core import to_json
+
+SSE_PING_FRAME = b'data: {"type":"ping"}\n\n'
+
+# Per-token frames differ only in their content string, so the envelope
+# around it is spliced in as constant bytes instead of re-serializing a dict.
+_CHUNK_PREFIX = b'data: {"type":"chunk","content":'
+_ERROR_PREFIX = b'data: {"type":"error","message":'
+_SUFFIX = b"}\n\n"
+
+
+def sse_frame(payload: dict) -> bytes:
+    """Encode *payload* as a single Server-Sent Events ``data:`` frame."""
+    return b"data: " + to_json(payload) + b"\n\n"
+
+
+def sse_chunk_frame(chunk: str) -> bytes:
+    """SSE frame for one streamed text chunk (same bytes as ``sse_frame``)."""
+    return _CHUNK_PREFIX + to_json(chunk) + _SUFFIX
+
+
+def sse_error_frame(message: str) -> bytes:
+    """SSE error frame; streaming responses can't raise HTTPException once started."""
+    return _ERROR_PREFIX + to_json(message) + _SUFFIX
@@ -25,6 +25,12 @@ async def _mock_current_user() -> str:
     return MOCK_USER_ID
 
 
+async def stream_chunks(*parts: str):
+    """Async iterator over *parts*, standing in for LLM.stream in judge mocks."""
+    for part in parts:
+        yield part
+
+
 @pytest.fixture(autouse=True)
 def _reset_state():
     """Reset rate-limiter storage and dependency overrides between tests."""
@@ -0,0 +1,105 @@
+"""Tests for direct Anthropic Messages API helpers (prompt caching, SSE parsing)."""
+
+import pytest
+from pydantic_core import from_json
+
+from sessions import Turn, add_turn, create_session
+
+import main
+from main import (
+    _anthropic_cached_messages,
+    _anthropic_cached_system,
+    _anthropic_session_payload,
+    _anthropic_stream_events,
+    _read_error_body,
+)
+
+
+def test_last_assistant_turn_is_cache_breakpoint():
+    messages = [
+        {"role": "user", "content": "a"},
+        {"role": "assistant", "content": "b"},
+        {"role": "user", "content": "c"},
+        {"role": "assistant", "content": "d"},
+        {"role": "user", "content": "e"},
+    ]
+    marked = _anthropic_cached_messages(messages)
+
+    assert marked[3] == {
+        "role": "assistant",
+        "content": [{"type": "text", "text": "d", "cache_control": {"type": "ephemeral"}}],
+    }
+    assert marked[1] == {"role": "assistant", "content": "b"}
+    assert marked[-1] == {"role": "user", "content": "e"}
+    # Caller's list is left untouched.
+    assert messages[3] == {"role": "assistant", "content": "d"}
+
+
+def test_first_turn_has_no_breakpoint():
+    messages = [{"role": "user", "content": "hi"}]
+    assert _anthropic_cached_messages(messages) is messages
+
+
+def test_system_prompt_block():
+    assert _anthropic_cached_system("sys") == [
+        {"type": "text", "text": "sys", "cache_control": {"type": "ephemeral"}}
+    ]
+
+
+class _FakeStream:
+    def __init__(self, chunks: list[bytes]):
+        self._chunks = chunks
+
+    async def aiter_bytes(self):
+        for c in self._chunks:
+            yield c
+
+
+@pytest.mark.asyncio
+async def test_stream_events_split_across_chunks_and_skip_noise():
+    body = (
+        b'event: message_start\r\ndata: {"type":"message_start","message":{"usage":{"input_tokens":5}}}\r\n\r\n'
+        b'event: ping\ndata: {"type": "ping"}\n\n'
+        b'event: content_block_start\ndata: {"type":"content_block_start","index":0}\n\n'
+        b'event: content_block_delta\ndata: {"type":"content_block_delta","delta":{"type":"text_delta","text":""}}\n\n'
+        b'event: content_block_delta\ndata: {"type":"content_block_delta","delta":{"type":"text_delta","text":"hi"}}\n\n'
+        b'event: message_stop\ndata: {"type":"message_stop"}\n\n'
+    )
+    chunks = [body[i:i + 7] for i in range(0, len(body), 7)]
+
+    events = [e async for e in _anthropic_stream_events(_FakeStream(chunks))]
+
+    assert [evt for evt, _ in events] == ["message_start", "content_block_delta", "message_stop"]
+    assert events[0][1]["message"]["usage"]["input_tokens"] == 5
+    assert events[1][1] == "hi"
+
+
+@pytest.mark.asyncio
+async def test_delta_text_escapes_are_decoded():
+    body = (
+        b'data: {"type":"content_block_delta","delta":{"type":"text_delta","text":"a \\"q\\"\\n\\u2713"}}\n'
+        b'data: {"type":"content_block_delta","delta":{"type":"input_json_delta","partial_json":"{}"}}\n'
+    )
+    events = [e async for e in _anthropic_stream_events(_FakeStream([body]))]
+    assert events == [("content_block_delta", 'a "q"\n\u2713')]
+
+
+@pytest.mark.asyncio
+async def test_error_body_read_is_capped(monkeypatch):
+    monkeypatch.setattr(main, "_ERROR_BODY_LIMIT", 10)
+    body = await _read_error_body(_FakeStream([b"abcdef", b"ghijkl", b"mnop"]))
+    assert body == "abcdefghij"
+
+
+def test_session_payload_matches_dict_encoding():
+    session = create_session("fizzbuzz", "claude-haiku-4-5")
+    for i in range(3):
+        add_turn(session.id, Turn(turn_number=i + 1, prompt_text=f"p{i}", response_text=f"r{i}"))
+        body = from_json(_anthropic_session_payload("claude-x", session, f"next{i}"))
+
+        expected = [*session.history(), {"role": "user", "content": f"next{i}"}]
+        assert body["model"] == "claude-x"
+        assert body["stream"] is True
+        assert body["messages"] == _anthropic_cached_messages(expected)
+    # The cached encodings themselves stay unmarked.
+    assert b"cache_control" not in b"".join(session.history_json())
@@ -1,6 +1,6 @@
 """Tests for Challenge and RepoContext Pydantic models."""
 import pytest
-from challenges import Challenge, RepoContext
+from challenges import Challenge, RepoContext, get_challenge_by_id, get_test_suite_dicts
 
 
 def test_repo_context_model():
@@ -44,3 +44,14 @@ def test_challenge_defaults():
     assert c.user_id is None
     assert c.repo_context is None
     assert c.test_files == []
+
+
+def test_test_suite_dicts_cached_per_challenge():
+    dicts = get_test_suite_dicts("fizzbuzz")
+    expected = [t.model_dump() for t in get_challenge_by_id("fizzbuzz").test_suite]
+    assert list(dicts) == expected
+    assert get_test_suite_dicts("fizzbuzz") is dicts
+
+
+def test_test_suite_dicts_unknown_challenge_is_empty():
+    assert get_test_suite_dicts("does-not-exist") == ()
@@ -0,0 +1,137 @@
+"""Tests for /api/evaluate-ui and its judge helpers."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+from httpx import AsyncClient
+
+import response_cache
+from tests.conftest import stream_chunks
+
+
+@pytest.fixture(autouse=True)
+def _clear_ui_evaluation_cache():
+    response_cache.ui_evaluation.clear()
+    yield
+    response_cache.ui_evaluation.clear()
+
+
+@pytest.mark.asyncio
+async def test_evaluate_ui_reuses_score_for_identical_html(auth_client: AsyncClient):
+    judge = MagicMock()
+    judge.stream = MagicMock(side_effect=lambda prompt: stream_chunks('{"score": 72, "reasoning": "close"}'))
+    body = {"challenge_id": "build-landing-page", "generated_html": "<html>x</html>"}
+
+    with patch("main._create_judge_llm", return_value=judge):
+        first = await auth_client.post("/api/evaluate-ui", json=body)
+        second = await auth_client.post("/api/evaluate-ui", json=body)
+        changed = await auth_client.post("/api/evaluate-ui", json={**body, "generated_html": "<html>y</html>"})
+
+    assert first.status_code == second.status_code == changed.status_code == 200
+    assert second.json() == first.json() == {"score": 72.0, "similarity_score": 0.72, "detailed_feedback": "close"}
+    assert judge.stream.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_judge_json_is_extracted_as_it_streams():
+    from main import _stream_first_json_object
+
+    consumed = []
+
+    async def chunks():
+        for part in ('Sure:\n```json\n{"score": 8', '0, "reasoning": "has } and \\" in it"', "}\n```", " trailing prose"):
+            consumed.append(part)
+            yield part
+
+    text, obj = await _stream_first_json_object(chunks())
+    assert obj == '{"score": 80, "reasoning": "has } and \\" in it"}'
+    assert text.endswith("```")
+    assert len(consumed) == 3
+
+
+@pytest.mark.asyncio
+async def test_reference_html_reloads_only_when_file_changes(tmp_path, monkeypatch):
+    import os
+
+    import main
+
+    monkeypatch.setattr(main, "_PROJECT_ROOT", tmp_path)
+    monkeypatch.setattr(main, "_REFERENCE_HTML_CACHE", {})
+    page = tmp_path / "ref.html"
+    page.write_text("<p>a</p>", encoding="utf-8")
+
+    first = await main._load_reference_html("ref.html")
+    page.write_text("<p>b</p>", encoding="utf-8")
+    os.utime(page, ns=(0, main._REFERENCE_HTML_CACHE["ref.html"][0]))
+    assert await main._load_reference_html("ref.html") == first
+
+    os.utime(page, ns=(0, main._REFERENCE_HTML_CACHE["ref.html"][0] + 1))
+    content, digest = await main._load_reference_html("ref.html")
+    assert content == "<p>b</p>" and digest != first[1]
+    with pytest.raises(FileNotFoundError):
+        await main._load_reference_html("missing.html")
+
+
+def test_judge_html_budget_trims_only_the_submission():
+    from main import _HTML_CHARS_PER_TOKEN, _HTML_TRUNCATION_MARKER, _fit_html_to_token_budget
+
+    assert _fit_html_to_token_budget("r" * 10, "g" * 10, 100) == ("r" * 10, "g" * 10)
+
+    budget_chars = 100 * _HTML_CHARS_PER_TOKEN
+    ref, gen = _fit_html_to_token_budget("r" * 100, "g" * 900, 100)
+    assert ref == "r" * 100
+    assert gen == "g" * (budget_chars - 100) + _HTML_TRUNCATION_MARKER
+
+    # A reference over budget on its own still goes in whole.
+    ref, gen = _fit_html_to_token_budget("r" * 1000, "g" * 10, 100)
+    assert ref == "r" * 1000
+    assert gen == _HTML_TRUNCATION_MARKER
+
+
+@pytest.mark.asyncio
+async def test_evaluate_ui_rejects_oversized_submission(auth_client: AsyncClient):
+    from main import _UI_EVAL_MAX_SUBMISSION_CHARS
+
+    resp = await auth_client.post("/api/evaluate-ui", json={
+        "challenge_id": "build-landing-page",
+        "generated_html": "x" * (_UI_EVAL_MAX_SUBMISSION_CHARS + 1),
+    })
+    assert resp.status_code == 413
+
+
+@pytest.mark.asyncio
+async def test_large_judge_json_is_parsed_off_loop(monkeypatch):
+    import main
+
+    offloaded = []
+
+    async def fake_to_thread(fn, *args):
+        offloaded.append(len(args[0]))
+        return fn(*args)
+
+    monkeypatch.setattr(main.asyncio, "to_thread", fake_to_thread)
+    small = '{"score": 1, "reasoning": "ok"}'
+    large = '{"score": 2, "reasoning": "' + "x" * main._JSON_OFFLOAD_CHARS + '"}'
+
+    assert (await main._parse_judge_json(small))["score"] == 1
+    assert (await main._parse_judge_json(large))["score"] == 2
+    assert offloaded == [len(large)]
+
+
+@pytest.mark.asyncio
+async def test_evaluate_ui_scores_exact_copy_without_judge(auth_client: AsyncClient):
+    import main
+
+    challenge = next(c for c in main.get_all_challenges() if c.category == "UI" and c.html_url)
+    reference, _ = main._read_reference_html(challenge.html_url)
+    judge = MagicMock()
+
+    with patch("main._create_judge_llm", return_value=judge):
+        resp = await auth_client.post("/api/evaluate-ui", json={
+            "challenge_id": challenge.id,
+            "generated_html": "<!-- mine -->\n" + "  ".join(reference.split()),
+        })
+
+    assert resp.status_code == 200
+    assert resp.json()["score"] == 100.0
+    judge.stream.assert_not_called()
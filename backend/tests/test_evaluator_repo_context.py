@@ -34,7 +34,7 @@ async def test_evaluate_routes_to_repo_context_when_present():
 
     with patch("integrations.store.get_integration", return_value="ghp_tok"):
         with patch(
-            "evaluation.evaluator.run_in_repo_context",
+            "integrations.github_runner.run_in_repo_context",
             new_callable=AsyncMock,
             return_value=(mock_results, "1 passed"),
         ) as mock_run:
@@ -91,7 +91,7 @@ async def test_evaluate_handles_execution_failure():
 
     with patch("integrations.store.get_integration", return_value="ghp_tok"):
         with patch(
-            "evaluation.evaluator.run_in_repo_context",
+            "integrations.github_runner.run_in_repo_context",
             new_callable=AsyncMock,
             return_value=(failed_results, ""),
         ):
@@ -270,7 +270,7 @@ async def test_generate_challenge_merged_pr_repo_context(auth_client):
         patch("integrations.linear.get_linear_issue", new_callable=AsyncMock) as mock_issue,
         patch("integrations.github.get_pr_info", new_callable=AsyncMock) as mock_pr,
         patch("integrations.generate.LLM") as MockLLM,
-        patch("integrations.generate.discover_pr_fixed_tests", new_callable=AsyncMock) as mock_discover,
+        patch("integrations.github_runner.discover_pr_fixed_tests", new_callable=AsyncMock) as mock_discover,
     ):
         mock_store.side_effect = lambda uid, provider: (
             "lin_tok" if provider == "linear" else "ghp_tok"
@@ -324,7 +324,7 @@ async def test_generate_challenge_merged_pr_fallback_repo_context_still_set(auth
         patch("integrations.linear.get_linear_issue", new_callable=AsyncMock) as mock_issue,
         patch("integrations.github.get_pr_info", new_callable=AsyncMock) as mock_pr,
         patch("integrations.generate.LLM") as MockLLM,
-        patch("integrations.generate.discover_pr_fixed_tests", new_callable=AsyncMock) as mock_discover,
+        patch("integrations.github_runner.discover_pr_fixed_tests", new_callable=AsyncMock) as mock_discover,
     ):
         mock_store.side_effect = lambda uid, provider: (
             "lin_tok" if provider == "linear" else "ghp_tok"
@@ -0,0 +1,84 @@
+"""Tests for LLM client construction, the shared HTTP connection pool, token estimates
+and the in-process function test runner."""
+
+import httpx
+import pytest
+
+import llm as llm_module
+from llm import LLM, close_shared_http_client, estimate_tokens, get_shared_http_client, run_function_tests_local
+
+
+def test_llm_instances_share_http_pool():
+    a = LLM(api_key="k1")
+    b = LLM(api_key="k2", base_url="https://api.x.ai/v1")
+    shared = get_shared_http_client()
+    assert a.client._client is shared
+    assert b.client._client is shared
+
+
+def test_injected_http_client_is_used():
+    custom = httpx.AsyncClient()
+    instance = LLM(api_key="k", http_client=custom)
+    assert instance.client._client is custom
+
+
+@pytest.mark.asyncio
+async def test_close_shared_http_client_recreates_on_next_use():
+    first = get_shared_http_client()
+    await close_shared_http_client()
+    assert first.is_closed
+    assert llm_module._shared_http_client is None
+    assert get_shared_http_client() is not first
+
+
+def test_estimate_tokens_from_length():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("one") == 1
+    assert estimate_tokens("hello world\nagain") == 4
+    assert estimate_tokens("x" * 4000) == 1000
+
+
+@pytest.mark.asyncio
+async def test_anthropic_calls_go_through_shared_pool(monkeypatch):
+    from evaluation.test_generator import AnthropicLLM
+
+    seen: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        return httpx.Response(200, json={
+            "model": "claude-opus-4-6",
+            "content": [{"type": "text", "text": "ok"}],
+            "usage": {"input_tokens": 3, "output_tokens": 1},
+        })
+
+    monkeypatch.setattr(llm_module, "_shared_http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+    result = await AnthropicLLM(api_key="k").generate("hi")
+
+    assert result.response_text == "ok"
+    assert [r.url.host for r in seen] == ["api.anthropic.com"]
+    assert seen[0].headers["x-api-key"] == "k"
+
+
+def test_local_function_tests_get_list_helpers_and_fresh_namespace():
+    code = "def reverse(a):\n    return list_to_arr(arr_to_list(a[::-1]))\nseen = []\n"
+    suite = [
+        {"input": "reverse([1, 2, 3])", "expected_output": "[3, 2, 1]"},
+        {"input": "seen.append(1) or len(seen)", "expected_output": "1"},
+    ]
+
+    assert run_function_tests_local(code, suite) == (1.0, [True, True])
+    assert run_function_tests_local(code, suite) == (1.0, [True, True])
+
+
+def test_local_function_tests_compile_unchanged_code_once():
+    llm_module._compiled.cache_clear()
+    code = "def double(x):\n    return 2 * x\n"
+    suite = [{"input": "double(2)", "expected_output": "4"}]
+
+    run_function_tests_local(code, suite)
+    run_function_tests_local(code, suite)
+
+    info = llm_module._compiled.cache_info()
+    assert (info.misses, info.hits) == (3, 3)
@@ -0,0 +1,69 @@
+"""Tests for PRD feedback: score parsing and /api/prompt-feedback."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from main import _append_prd_score_block, _parse_prd_section_scores
+from tests.conftest import stream_chunks
+
+_FEEDBACK = """### Summary
+Solid.
+
+### Feasibility (8)
+ok
+### Expertise (7)
+ok
+### Clarity & Actionability (12)
+ok
+### Alignment with Discovery (6)
+ok
+### Research (9)
+ok
+"""
+
+
+def test_five_dimensions_scale_to_100():
+    scores, total = _parse_prd_section_scores(_FEEDBACK)
+    assert scores == [
+        ("Feasibility", 8), ("Expertise", 7), ("Clarity & Actionability", 10),
+        ("Alignment with Discovery", 6), ("Research", 9),
+    ]
+    assert total == 80
+
+
+def test_headings_after_the_fifth_are_ignored():
+    scores, total = _parse_prd_section_scores(_FEEDBACK + "\n### Feasibility (0)\n")
+    assert len(scores) == 5
+    assert total == 80
+
+
+def test_four_dimensions_and_score_block():
+    four = _FEEDBACK.split("### Research")[0]
+    assert _parse_prd_section_scores(four)[1] == round(31 * 10 / 4)
+    assert "PRD Score: **780 / 1000**" in _append_prd_score_block(four)
+    assert _append_prd_score_block("no headings") == "no headings"
+
+
+@pytest.mark.asyncio
+async def test_prd_feedback_is_never_reused_across_requests(auth_client, monkeypatch):
+    import main
+
+    async def no_research(problem: str) -> str:
+        return ""
+
+    monkeypatch.setattr(main, "_fetch_research_insights", no_research)
+    judge = MagicMock()
+    judge.stream = MagicMock(side_effect=[stream_chunks("first review"), stream_chunks("second review")])
+    body = {
+        "messages": [], "challenge_id": "loss-reserve-prd", "challenge_category": "product",
+        "challenge_description": "problem", "prd_content": "Same PRD",
+    }
+
+    with patch("main._create_judge_llm", return_value=judge):
+        first = await auth_client.post("/api/prompt-feedback", json=body)
+        second = await auth_client.post("/api/prompt-feedback", json=body)
+
+    assert judge.stream.call_count == 2
+    assert "first review" in first.text
+    assert "second review" in second.text
@@ -0,0 +1,79 @@
+"""Tests for the LLM response caches."""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+import response_cache
+from response_cache import ResponseCache, cache_key
+
+
+def test_key_depends_on_every_part():
+    msgs = [{"role": "user", "content": "hi"}]
+    key = cache_key("m", "sys", msgs)
+    assert key == cache_key("m", "sys", [{"role": "user", "content": "hi"}])
+    assert key != cache_key("m", "other sys", msgs)
+    assert key != cache_key("m2", "sys", msgs)
+
+
+def test_get_honours_ttl(monkeypatch):
+    cache = ResponseCache()
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: now[0])
+    cache.set("k", "answer")
+
+    assert cache.get("k", ttl_seconds=60) == "answer"
+    now[0] += 61
+    assert cache.get("k", ttl_seconds=60) is None
+    assert cache.stats() == {"entries": 0, "hits": 1, "misses": 1}
+
+
+def test_set_evicts_least_recently_used():
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a", ttl_seconds=60)
+    cache.set("c", "3")
+
+    assert cache.get("b", ttl_seconds=60) is None
+    assert cache.get("a", ttl_seconds=60) == "1"
+    assert cache.get("c", ttl_seconds=60) == "3"
+
+
+@pytest.mark.asyncio
+async def test_research_insights_are_cached_per_problem_statement(monkeypatch):
+    from unittest.mock import AsyncMock
+
+    import main
+
+    research = MagicMock()
+    research.generate = AsyncMock(return_value=MagicMock(response_text=" - insight \n"))
+    monkeypatch.setattr(main, "_research_llm", lambda: research)
+    monkeypatch.setattr(main.settings, "perplexity_api_key", "key")
+    monkeypatch.setattr(response_cache, "research_insights", ResponseCache())
+
+    assert await main._fetch_research_insights("Problem A") == "- insight"
+    assert await main._fetch_research_insights("  Problem A ") == "- insight"
+    await main._fetch_research_insights("Problem B")
+    assert research.generate.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_product_challenge_research_is_prefetched(monkeypatch):
+    from unittest.mock import AsyncMock
+
+    import main
+
+    research = MagicMock()
+    research.generate = AsyncMock(return_value=MagicMock(response_text="insight"))
+    monkeypatch.setattr(main, "_research_llm", lambda: research)
+    monkeypatch.setattr(main.settings, "perplexity_api_key", "key")
+    monkeypatch.setattr(response_cache, "research_insights", ResponseCache())
+
+    await main._prefetch_research_insights()
+    prefetched = research.generate.await_count
+    product = next(c for c in main.get_all_challenges() if c.category == "product")
+
+    assert prefetched >= 1
+    assert await main._fetch_research_insights(product.description) == "insight"
+    assert research.generate.await_count == prefetched
@@ -0,0 +1,27 @@
+"""Tests for response compression (JSON is gzipped, SSE streams are not)."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+from httpx import AsyncClient
+
+from tests.conftest import stream_chunks
+
+
+@pytest.mark.asyncio
+async def test_json_is_gzipped_but_sse_is_not(auth_client: AsyncClient):
+    judge = MagicMock()
+    judge.stream = MagicMock(side_effect=lambda prompt, **kw: stream_chunks("x" * 2000))
+
+    listing = await auth_client.get("/api/challenges", headers={"Accept-Encoding": "gzip"})
+    with patch("main._create_judge_llm", return_value=judge):
+        feedback = await auth_client.post(
+            "/api/prompt-feedback",
+            headers={"Accept-Encoding": "gzip"},
+            json={"messages": [{"role": "user", "content": "hi"}], "challenge_id": "fizzbuzz"},
+        )
+
+    assert listing.headers.get("content-encoding") == "gzip"
+    assert feedback.status_code == 200
+    assert "content-encoding" not in feedback.headers
+    assert "x" * 2000 in feedback.text
@@ -0,0 +1,605 @@
+"""Tests for the sandbox test runners (Modal exec replaced by local fakes)."""
+
+import asyncio
+import json
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+import sandbox
+
+
+async def _run_locally(sandbox_id: str, code: str) -> dict:
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=30)
+    return {"stdout": proc.stdout, "stderr": proc.stderr, "returncode": proc.returncode}
+
+
+@pytest.fixture()
+def local_exec(monkeypatch):
+    calls: list[str] = []
+
+    async def _fake(sandbox_id: str, code: str) -> dict:
+        calls.append(code)
+        return await _run_locally(sandbox_id, code)
+
+    monkeypatch.setattr(sandbox, "run_code_in_sandbox", _fake)
+    return calls
+
+
+SQUARE = "def square(x):\n    return x * x\n"
+
+
+@pytest.mark.asyncio
+async def test_small_suite_runs_in_one_process(local_exec):
+    suite = [
+        {"input": "square(2)", "expected_output": "4"},
+        {"input": "square(3)", "expected_output": "10"},
+    ]
+    results = await sandbox.run_tests_in_sandbox("sb", SQUARE, suite)
+
+    assert len(local_exec) == 1
+    assert [r["passed"] for r in results] == [True, False]
+    assert results[1]["actual"] == "9"
+
+
+@pytest.mark.asyncio
+async def test_large_suite_is_batched_and_keeps_order(local_exec, monkeypatch):
+    monkeypatch.setattr(sandbox, "_TESTS_PER_RUNNER", 3)
+    suite = [{"input": f"square({i})", "expected_output": str(i * i)} for i in range(10)]
+
+    results = await sandbox.run_tests_in_sandbox("sb", SQUARE, suite)
+
+    assert len(local_exec) == 4
+    assert [r["input"] for r in results] == [tc["input"] for tc in suite]
+    assert all(r["passed"] for r in results)
+
+
+@pytest.mark.asyncio
+async def test_empty_suite_never_reaches_the_sandbox(local_exec, cpp_sandbox):
+    assert await sandbox.run_tests_in_sandbox("sb", SQUARE, []) == []
+    assert await sandbox.run_tests_in_sandbox("cpp", CPP_MAIN, []) == []
+    assert local_exec == [] and cpp_sandbox.calls == []
+
+
+@pytest.mark.asyncio
+async def test_code_error_reported_per_test(local_exec):
+    suite = [{"input": "square(2)", "expected_output": "4"}]
+    results = await sandbox.run_tests_in_sandbox("sb", "def square(x):\n    raise\nsquare(", suite)
+
+    assert results[0]["passed"] is False
+    assert results[0]["error"]
+
+
+def _aio(value):
+    """Modal-style method stub: ``obj.method.aio()`` returning *value*."""
+
+    async def call(*args, **kwargs):
+        return value
+
+    return SimpleNamespace(aio=call)
+
+
+def _proc(returncode: int = 0, stdout: str = "", stderr: str = "", stdin: list | None = None) -> SimpleNamespace:
+    return SimpleNamespace(
+        returncode=returncode,
+        stdin=SimpleNamespace(
+            write=(stdin if stdin is not None else []).append,
+            write_eof=lambda: None,
+            drain=_aio(None),
+        ),
+        stdout=SimpleNamespace(read=_aio(stdout)),
+        stderr=SimpleNamespace(read=_aio(stderr)),
+        wait=_aio(returncode),
+    )
+
+
+class _FakeCppSandbox:
+    """Records exec calls and stdin; 'binaries' echo their stdin, harnesses print PASS."""
+
+    def __init__(self):
+        self.calls: list[tuple] = []
+        self.stdin: list[str] = []
+        self.exec = SimpleNamespace(aio=self._exec)
+
+    async def _exec(self, *args, timeout: int | None = None):
+        self.calls.append(args)
+        if args[0].startswith(sandbox._CPP_BUILD_DIR):
+            # Echo whatever was written to stdin; harnesses get none.
+            written: list[str] = []
+            proc = _proc(stdin=written)
+
+            async def read_stdout():
+                return "".join(written) or "PASS\n"
+
+            proc.stdout.read = SimpleNamespace(aio=read_stdout)
+            return proc
+        return _proc(stdin=self.stdin)
+
+    def compiles(self) -> int:
+        return sum(1 for c in self.calls if "g++" in " ".join(c))
+
+
+@pytest.fixture()
+def cpp_sandbox(monkeypatch):
+    sb = _FakeCppSandbox()
+    monkeypatch.setitem(sandbox._sandboxes, "cpp", sb)
+    monkeypatch.setattr(sandbox, "_compiled_binaries", {})
+    return sb
+
+
+CPP_MAIN = "#include <iostream>\nint main() { return 0; }\n"
+
+
+@pytest.mark.asyncio
+async def test_unchanged_cpp_code_is_compiled_once(cpp_sandbox):
+    suite = [{"input": "7", "expected_output": "7"}, {"input": "TEST_CONCURRENT_PUSH_POP", "expected_output": "PASS"}]
+
+    first = await sandbox.run_tests_in_sandbox("cpp", CPP_MAIN, suite)
+    second = await sandbox.run_tests_in_sandbox("cpp", CPP_MAIN, suite)
+
+    assert first == second
+    assert [r["passed"] for r in first] == [True, True]
+    assert cpp_sandbox.compiles() == 3  # solution + ASan and TSan harnesses, first run only
+    assert not any(c[0] == "python" for c in cpp_sandbox.calls)
+    assert CPP_MAIN in cpp_sandbox.stdin
+    assert cpp_sandbox.calls[0][:2] == ("bash", "-c")
+
+    await sandbox.run_tests_in_sandbox("cpp", CPP_MAIN + "// edit\n", suite[:1])
+    assert cpp_sandbox.compiles() == 4
+
+
+@pytest.mark.asyncio
+async def test_build_that_raises_is_retried(cpp_sandbox, monkeypatch):
+    attempts = []
+    real_exec = cpp_sandbox._exec
+
+    async def flaky_exec(*args, timeout=None):
+        if "g++" in " ".join(args):
+            attempts.append(args)
+            if len(attempts) == 1:
+                raise ConnectionError("modal exec failed")
+        return await real_exec(*args, timeout=timeout)
+
+    monkeypatch.setattr(cpp_sandbox, "exec", SimpleNamespace(aio=flaky_exec))
+
+    with pytest.raises(ConnectionError):
+        await sandbox._compile_cpp("cpp", cpp_sandbox, CPP_MAIN, ["-O2"])
+    binary, error = await sandbox._compile_cpp("cpp", cpp_sandbox, CPP_MAIN, ["-O2"])
+
+    assert binary is not None and error == ""
+    assert len(attempts) == 2
+
+
+@pytest.mark.asyncio
+async def test_cpp_cases_run_concurrently_in_order(cpp_sandbox, monkeypatch):
+    running = 0
+    peak = 0
+    exec_fake = cpp_sandbox._exec
+
+    async def slow_exec(*args, **kwargs):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return await exec_fake(*args, **kwargs)
+
+    cpp_sandbox.exec.aio = slow_exec
+    suite = [{"input": str(i), "expected_output": str(i)} for i in range(6)]
+
+    results = await sandbox.run_tests_in_sandbox("cpp", CPP_MAIN, suite)
+
+    assert [r["actual"] for r in results] == [str(i) for i in range(6)]
+    assert 1 < peak <= sandbox._MAX_CONCURRENT_RUNNERS
+    assert cpp_sandbox.compiles() == 1
+
+
+class _LocalWorkerSandbox:
+    """Starts sandbox.exec'd Python workers (and other commands) as local subprocesses."""
+
+    def __init__(self):
+        self.processes: list[asyncio.subprocess.Process] = []
+        self.requests: list[dict] = []
+        self.commands: list[tuple] = []  # anything exec'd other than python
+        self.exec = SimpleNamespace(aio=self._exec)
+
+    def _write(self, proc: asyncio.subprocess.Process, data: bytes) -> None:
+        self.requests.append(json.loads(data))
+        proc.stdin.write(data)
+
+    async def _exec(self, *args, **kwargs):
+        if args[0] != "python":
+            self.commands.append(args)
+            proc = await asyncio.create_subprocess_exec(*args)
+            return SimpleNamespace(wait=SimpleNamespace(aio=proc.wait))
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, *args[1:],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        self.processes.append(proc)
+        stdin = SimpleNamespace(
+            write=lambda data: self._write(proc, data),
+            write_eof=proc.stdin.write_eof,
+            drain=SimpleNamespace(aio=proc.stdin.drain),
+        )
+        return SimpleNamespace(stdin=stdin, stdout=proc.stdout)
+
+
+@pytest.fixture()
+async def worker_sandbox(monkeypatch, local_exec):
+    sb = _LocalWorkerSandbox()
+    monkeypatch.setitem(sandbox._sandboxes, "py", sb)
+    monkeypatch.setattr(sandbox, "_python_workers", {})
+    yield sb
+    for proc in sb.processes:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+
+
+@pytest.mark.asyncio
+async def test_python_worker_is_reused_across_runs(worker_sandbox, local_exec):
+    suite = [{"input": "square(3)", "expected_output": "9"}]
+    noisy = SQUARE + "print('hello from user code')\n"
+
+    first = await sandbox.run_tests_in_sandbox("py", noisy, suite)
+    second = await sandbox.run_tests_in_sandbox("py", SQUARE.replace("x * x", "x + x"), suite)
+
+    assert first[0] == {"input": "square(3)", "expected": "9", "passed": True, "error": None}
+    assert second[0] == {**first[0], "actual": "6", "passed": False}
+    assert len(worker_sandbox.processes) == 1
+    assert local_exec == []
+
+
+@pytest.mark.asyncio
+async def test_python_worker_is_sent_each_solution_once(worker_sandbox, monkeypatch):
+    monkeypatch.setattr(sandbox, "_TESTS_PER_RUNNER", 1)
+    monkeypatch.setattr(sandbox, "_MAX_CONCURRENT_RUNNERS", 1)
+    suite = [{"input": f"square({i})", "expected_output": str(i * i)} for i in range(3)]
+
+    first = await sandbox.run_tests_in_sandbox("py", SQUARE, suite)
+    second = await sandbox.run_tests_in_sandbox("py", SQUARE, suite)
+
+    assert first == second and all(r["passed"] for r in first)
+    assert len(worker_sandbox.requests) == 6
+    assert sum("code" in r for r in worker_sandbox.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_python_worker_survives_exiting_code(worker_sandbox, local_exec):
+    suite = [{"input": "square(2)", "expected_output": "4"}]
+
+    exited = await sandbox.run_tests_in_sandbox("py", "import sys\nsys.exit(3)\n", suite)
+    ok = await sandbox.run_tests_in_sandbox("py", SQUARE, suite)
+
+    assert exited[0]["passed"] is False
+    assert exited[0]["error"] == "Sandbox execution error: 3"
+    assert ok[0]["passed"] is True
+    assert len(worker_sandbox.processes) == 1
+
+
+@pytest.mark.asyncio
+async def test_dead_python_worker_falls_back_to_one_shot_runner(worker_sandbox, local_exec):
+    suite = [{"input": "square(2)", "expected_output": "4"}]
+    await sandbox.run_tests_in_sandbox("py", SQUARE, suite)
+    worker_sandbox.processes[0].kill()
+    await worker_sandbox.processes[0].wait()
+
+    results = await sandbox.run_tests_in_sandbox("py", SQUARE, suite)
+    assert results[0]["passed"] is True
+    assert len(local_exec) == 1
+
+    await sandbox.run_tests_in_sandbox("py", SQUARE, suite)
+    assert len(worker_sandbox.processes) == 2
+
+
+@pytest.mark.asyncio
+async def test_python_worker_reuses_compiled_sources(worker_sandbox):
+    # The worker compiles the code and every input and expected output before
+    # forking, so the suite's child finds all five already cached. The next
+    # run adds only its new code and "7" to the cache the first one left.
+    code = SQUARE + "import __main__\ndef cached_sources():\n    return len(__main__._compiled)\n"
+    suite = [
+        {"input": "square(4)", "expected_output": "16"},
+        {"input": "cached_sources()", "expected_output": "5"},
+    ]
+
+    first = await sandbox.run_tests_in_sandbox("py", code, suite)
+    second = await sandbox.run_tests_in_sandbox("py", code.replace("x * x", "x ** 2"), suite[:1] + [
+        {"input": "cached_sources()", "expected_output": "7"},
+    ])
+
+    assert [r["passed"] for r in first] == [True, True]
+    assert [r["passed"] for r in second] == [True, True]
+
+
+@pytest.mark.asyncio
+async def test_one_shot_runner_emits_a_line_per_test(local_exec):
+    suite = [{"input": "square(2)", "expected_output": "4"}, {"input": "square(3)", "expected_output": "9"}]
+    code = SQUARE + "print('debug output')\n"
+
+    results = await sandbox.run_tests_in_sandbox("sb", code, suite)
+
+    assert [r["passed"] for r in results] == [True, True]
+    stdout = (await _run_locally("sb", local_exec[0]))["stdout"]
+    assert len(stdout.splitlines()) == 2
+
+
+@pytest.mark.asyncio
+async def test_python_worker_keeps_results_before_suite_stops(worker_sandbox):
+    code = SQUARE + "import sys\n"
+    suite = [
+        {"input": "square(2)", "expected_output": "4"},
+        {"input": "sys.exit('bye')", "expected_output": "None"},
+        {"input": "square(3)", "expected_output": "9"},
+    ]
+
+    results = await sandbox.run_tests_in_sandbox("py", code, suite)
+
+    assert results[0]["passed"] is True
+    assert [r["error"] for r in results[1:]] == ["Sandbox execution error: bye"] * 2
+
+
+@pytest.mark.asyncio
+async def test_python_worker_runs_each_suite_isolated(worker_sandbox, local_exec):
+    meddling = (
+        "import sys, builtins\n"
+        "builtins.leaked = True\n"
+        "swallowed = sys.stdin.read()\n"
+        "def square(x):\n    return x * x\n"
+    )
+    suite = [{"input": "square(2)", "expected_output": "4"}, {"input": "swallowed", "expected_output": "''"}]
+    probe = [{"input": "hasattr(__import__('builtins'), 'leaked')", "expected_output": "False"}]
+
+    first = await sandbox.run_tests_in_sandbox("py", meddling, suite)
+    second = await sandbox.run_tests_in_sandbox("py", SQUARE, probe)
+
+    assert [r["passed"] for r in first + second] == [True, True, True]
+    assert len(worker_sandbox.processes) == 1
+    assert local_exec == []
+
+
+@pytest.mark.asyncio
+async def test_python_worker_kills_suite_that_ignores_the_alarm(worker_sandbox, monkeypatch):
+    monkeypatch.setattr(sandbox, "_SUITE_TIMEOUT_SEC", 1)
+    stubborn = "import signal\nsignal.signal(signal.SIGALRM, signal.SIG_IGN)\ndef spin():\n    while True:\n        pass\n"
+    suite = [{"input": "spin()", "expected_output": "None"}]
+
+    stuck = await sandbox.run_tests_in_sandbox("py", stubborn, suite)
+    ok = await sandbox.run_tests_in_sandbox("py", SQUARE, [{"input": "square(2)", "expected_output": "4"}])
+
+    assert stuck[0]["error"] == "Sandbox execution error: Test run timed out"
+    assert ok[0]["passed"] is True
+    assert len(worker_sandbox.processes) == 1
+
+
+@pytest.mark.asyncio
+async def test_unresponsive_python_worker_is_killed(worker_sandbox, local_exec, monkeypatch):
+    suite = [{"input": "square(2)", "expected_output": "4"}]
+    await sandbox.run_tests_in_sandbox("py", SQUARE, suite)
+    monkeypatch.setattr(sandbox, "_WORKER_REPLY_TIMEOUT_SEC", 0.5)
+    slow = "import time\ndef square(x):\n    time.sleep(1)\n    return x * x\n"
+
+    results = await sandbox.run_tests_in_sandbox("py", slow, suite)
+
+    assert results[0]["passed"] is True  # from the one-shot fallback
+    assert worker_sandbox.commands == [("kill", "-9", str(worker_sandbox.processes[0].pid))]
+    assert await worker_sandbox.processes[0].wait() == -9
+    assert sandbox._python_workers["py"] == []
+
+
+def test_backend_import_does_not_load_modal():
+    import os
+    from pathlib import Path
+
+    check = "import sys, main; sys.exit('modal' in sys.modules)"
+    proc = subprocess.run(
+        [sys.executable, "-c", check],
+        cwd=Path(sandbox.__file__).parent,
+        env={**os.environ, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "test")},
+        capture_output=True,
+        timeout=60,
+    )
+    assert proc.returncode == 0, proc.stderr.decode()[-500:]
+
+
+class _TerminableSandbox:
+    def __init__(self):
+        self.terminated = False
+        self.terminate = SimpleNamespace(aio=self._terminate)
+
+    async def _terminate(self):
+        self.terminated = True
+
+
+@pytest.mark.asyncio
+async def test_idle_sandboxes_are_reaped_least_recently_used_first(monkeypatch, local_exec):
+    now = [1000.0]
+    monkeypatch.setattr(sandbox.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(sandbox, "_sandboxes", sandbox.OrderedDict())
+    monkeypatch.setattr(sandbox, "_last_used", {})
+    boxes = {sid: _TerminableSandbox() for sid in ("old", "busy")}
+    for sid, sb in boxes.items():
+        sandbox._sandboxes[sid] = sb
+        sandbox._touch(sid)
+
+    async def no_worker(*args):
+        return None
+
+    monkeypatch.setattr(sandbox, "_run_in_worker", no_worker)
+    now[0] += sandbox._SANDBOX_IDLE_TIMEOUT_SEC - 1
+    await sandbox.run_tests_in_sandbox("busy", SQUARE, [{"input": "square(1)", "expected_output": "1"}])
+    assert list(sandbox._sandboxes) == ["old", "busy"]
+    now[0] += 1
+
+    assert await sandbox.reap_idle_sandboxes() == 1
+    assert boxes["old"].terminated and not boxes["busy"].terminated
+    assert list(sandbox._sandboxes) == ["busy"]
+
+
+@pytest.mark.asyncio
+async def test_harness_runs_under_both_sanitizers(cpp_sandbox):
+    exec_fake = cpp_sandbox._exec
+
+    def built_with_tsan(binary: str) -> bool:
+        return any(c[0] == "bash" and f"-o {binary} " in c[2] and "-fsanitize=thread" in c[2] for c in cpp_sandbox.calls)
+
+    async def tsan_reports_race(*args, **kwargs):
+        proc = await exec_fake(*args, **kwargs)
+        if built_with_tsan(args[0]):
+            proc.stderr.read = _aio("WARNING: ThreadSanitizer: data race")
+        return proc
+
+    cpp_sandbox.exec.aio = tsan_reports_race
+    [result] = await sandbox.run_tests_in_sandbox(
+        "cpp", CPP_MAIN, [{"input": "TEST_RECLAMATION_LEAKS", "expected_output": "PASS"}],
+    )
+
+    assert result["passed"] is False
+    assert "ThreadSanitizer" in result["error"]
+    assert cpp_sandbox.compiles() == 3
+
+
+@pytest.mark.asyncio
+async def test_one_shot_runner_script_is_reused_for_unchanged_runs(local_exec):
+    suite = [{"input": "square(5)", "expected_output": "25"}]
+    await sandbox.run_tests_in_sandbox("sb", SQUARE, suite)
+    await sandbox.run_tests_in_sandbox("sb", SQUARE, suite)
+
+    assert local_exec[0] is local_exec[1]
+
+
+@pytest.mark.asyncio
+async def test_run_code_sends_script_on_stdin(cpp_sandbox):
+    script = "print('x' * 10)\n" * 1000
+
+    result = await sandbox.run_code_in_sandbox("cpp", script)
+
+    assert cpp_sandbox.calls == [("python", "-")]
+    assert cpp_sandbox.stdin == [script]
+    assert result["returncode"] == 0
+
+
+@pytest.fixture()
+def modal_create(monkeypatch):
+    """Fake Modal app lookup and sandbox creation; returns the created sandboxes."""
+    import modal
+
+    created: list[_TerminableSandbox] = []
+
+    async def lookup(name, create_if_missing=False):
+        created_lookups.append(name)
+        return SimpleNamespace(name=name)
+
+    async def create(**kwargs):
+        sb = _TerminableSandbox()
+        sb.object_id = f"sb-{len(created)}"
+        created.append(sb)
+        return sb
+
+    async def no_worker(sb):
+        raise RuntimeError("no worker in tests")
+
+    created_lookups: list[str] = []
+    monkeypatch.setattr(modal.App, "lookup", SimpleNamespace(aio=lookup))
+    monkeypatch.setattr(modal.Sandbox, "create", SimpleNamespace(aio=create))
+    monkeypatch.setattr(sandbox, "_sandbox_image", lambda: None)
+    monkeypatch.setattr(sandbox, "_start_python_worker", no_worker)
+    monkeypatch.setattr(sandbox, "_app", None)
+    monkeypatch.setattr(sandbox, "_sandboxes", sandbox.OrderedDict())
+    monkeypatch.setattr(sandbox, "_last_used", {})
+    monkeypatch.setattr(sandbox, "_warm_pool", sandbox.deque())
+    monkeypatch.setattr(sandbox, "_refill_task", None)
+    return SimpleNamespace(sandboxes=created, lookups=created_lookups)
+
+
+@pytest.mark.asyncio
+async def test_sandbox_app_is_looked_up_once(modal_create, monkeypatch):
+    monkeypatch.setattr(sandbox, "_WARM_SANDBOXES", 0)
+
+    ids = [await sandbox.create_sandbox(), await sandbox.create_sandbox()]
+
+    assert ids == ["sb-0", "sb-1"]
+    assert modal_create.lookups == ["lucidly-sandbox"]
+
+
+@pytest.mark.asyncio
+async def test_sandboxes_are_handed_out_from_warm_pool(modal_create, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(sandbox.time, "monotonic", lambda: now[0])
+
+    assert await sandbox.create_sandbox() == "sb-0"  # cold, pool empty
+    await sandbox._refill_task
+    assert [sb.object_id for _, sb, _ in sandbox._warm_pool] == ["sb-1", "sb-2"]
+
+    assert await sandbox.create_sandbox() == "sb-2"
+    await sandbox._refill_task
+    assert len(modal_create.sandboxes) == 4
+
+    # Pooled sandboxes past their shelf life are terminated, not handed out.
+    now[0] += sandbox._WARM_MAX_AGE_SEC
+    await sandbox.reap_idle_sandboxes()
+    assert not sandbox._warm_pool
+    assert modal_create.sandboxes[1].terminated and modal_create.sandboxes[3].terminated
+
+
+@pytest.mark.asyncio
+async def test_full_pool_evicts_only_idle_sandboxes(modal_create, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(sandbox.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(sandbox, "_WARM_SANDBOXES", 0)
+    monkeypatch.setattr(sandbox, "_MAX_SANDBOXES", 2)
+    first, second = await sandbox.create_sandbox(), await sandbox.create_sandbox()
+
+    now[0] += sandbox._SANDBOX_EVICT_IDLE_SEC - 1
+    with pytest.raises(sandbox.SandboxCapacityError):
+        await sandbox.create_sandbox()
+    assert list(sandbox._sandboxes) == [first, second]
+
+    now[0] += 1
+    sandbox._touch(first)
+    third = await sandbox.create_sandbox()
+    assert list(sandbox._sandboxes) == [first, third]
+    assert modal_create.sandboxes[1].terminated and not modal_create.sandboxes[0].terminated
+
+
+@pytest.mark.asyncio
+async def test_app_shutdown_drains_warm_pool(monkeypatch):
+    import main
+
+    warm = _TerminableSandbox()
+    active = _TerminableSandbox()
+    monkeypatch.setattr(sandbox, "_warm_pool", sandbox.deque([(0.0, warm, None)]))
+    monkeypatch.setattr(sandbox, "_sandboxes", sandbox.OrderedDict(active=active))
+    monkeypatch.setattr(sandbox, "_refill_task", None)
+
+    async with main._lifespan(main.app):
+        assert not warm.terminated
+
+    assert warm.terminated and not sandbox._warm_pool
+    assert not active.terminated  # users reconnect to these after a restart
+
+
+@pytest.mark.asyncio
+async def test_terminate_all_terminates_concurrently(monkeypatch):
+    in_flight = [0, 0]  # current, peak
+
+    class _SlowSandbox(_TerminableSandbox):
+        async def _terminate(self):
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+            await asyncio.sleep(0.01)
+            in_flight[0] -= 1
+            self.terminated = True
+
+    boxes = [_SlowSandbox() for _ in range(4)]
+    monkeypatch.setattr(sandbox, "_sandboxes", sandbox.OrderedDict((f"sb-{i}", sb) for i, sb in enumerate(boxes[:3])))
+    monkeypatch.setattr(sandbox, "_last_used", {})
+    monkeypatch.setattr(sandbox, "_warm_pool", sandbox.deque([(0.0, boxes[3], None)]))
+
+    assert await sandbox.terminate_all() == 3
+    assert all(sb.terminated for sb in boxes)
+    assert in_flight[1] == 4
+    assert not sandbox._sandboxes and not sandbox._warm_pool
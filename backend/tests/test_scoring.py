@@ -0,0 +1,11 @@
+"""Tests for the scoring helpers in evaluation.scoring."""
+
+from evaluation.scoring import compute_accuracy_text
+
+
+def test_text_accuracy_counts_repeated_tokens():
+    assert compute_accuracy_text("a a b", "a  a\nb") == 1.0
+    assert compute_accuracy_text("a b", "a a b") == 2 / 3
+    assert compute_accuracy_text("a a a a", "a b") == 0.5
+    assert compute_accuracy_text("anything", "") == 0.0
+    assert compute_accuracy_text("anything", "   ") == 0.0
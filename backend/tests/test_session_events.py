@@ -0,0 +1,84 @@
+"""Tests for the in-process SSE event broadcast (bounded subscriber queues)."""
+
+import pytest
+
+import session_events
+from session_events import (
+    broadcast_session_event,
+    subscribe_session_events,
+    unsubscribe_session_events,
+)
+
+
+@pytest.fixture(autouse=True)
+def _small_queues(monkeypatch):
+    monkeypatch.setattr(session_events, "_QUEUE_MAXSIZE", 3)
+    session_events._session_queues.clear()
+    yield
+    session_events._session_queues.clear()
+
+
+def _drain(q) -> list[dict]:
+    out = []
+    while not q.empty():
+        out.append(q.get_nowait())
+    return out
+
+
+@pytest.mark.asyncio
+async def test_full_queue_sheds_oldest_token_progress():
+    q = subscribe_session_events("s1")
+    await broadcast_session_event("s1", {"type": "token_progress", "total_estimated_tokens": 1})
+    await broadcast_session_event("s1", {"type": "session_update"})
+    await broadcast_session_event("s1", {"type": "token_progress", "total_estimated_tokens": 2})
+    await broadcast_session_event("s1", {"type": "token_progress", "total_estimated_tokens": 3})
+
+    events = _drain(q)
+    assert [e["type"] for e in events] == ["session_update", "token_progress", "token_progress"]
+    assert [e.get("total_estimated_tokens") for e in events[1:]] == [2, 3]
+
+
+@pytest.mark.asyncio
+async def test_session_update_always_delivered_when_full():
+    q = subscribe_session_events("s1")
+    for i in range(3):
+        await broadcast_session_event("s1", {"type": "session_update", "n": i})
+    await broadcast_session_event("s1", {"type": "session_update", "n": 3})
+
+    assert [e["n"] for e in _drain(q)] == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_progress_dropped_when_queue_full_of_updates():
+    q = subscribe_session_events("s1")
+    for i in range(3):
+        await broadcast_session_event("s1", {"type": "session_update", "n": i})
+    await broadcast_session_event("s1", {"type": "token_progress", "total_estimated_tokens": 9})
+
+    assert [e["type"] for e in _drain(q)] == ["session_update"] * 3
+
+
+@pytest.mark.asyncio
+async def test_unsubscribe_removes_empty_session_entry():
+    q = subscribe_session_events("s1")
+    unsubscribe_session_events("s1", q)
+    assert "s1" not in session_events._session_queues
+    # Broadcasting to a session with no subscribers is a no-op.
+    await broadcast_session_event("s1", {"type": "ping"})
+    assert "s1" not in session_events._session_queues
+
+
+@pytest.mark.asyncio
+async def test_waiting_reader_wakes_on_broadcast():
+    import asyncio
+
+    q = subscribe_session_events("s1")
+    reader = asyncio.create_task(q.get())
+    await asyncio.sleep(0)
+    assert not reader.done()
+
+    await broadcast_session_event("s1", {"type": "session_update", "n": 1})
+    assert await asyncio.wait_for(reader, timeout=1) == {"type": "session_update", "n": 1}
+    assert q.empty()
+    with pytest.raises(asyncio.QueueEmpty):
+        q.get_nowait()
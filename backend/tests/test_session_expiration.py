@@ -1,6 +1,7 @@
 """Tests for session expiration, standard user flows, and adversarial API abuse."""
 
 import time
+from unittest.mock import patch
 
 import pytest
 from fastapi.testclient import TestClient
@@ -200,6 +201,27 @@ class TestStandardUserFlow:
         assert "already completed" in resp2.json()["detail"].lower()
 
 
+# =========================================================================
+# Submit — grading failures
+# =========================================================================
+
+
+class TestSubmitGradingFailure:
+
+    def test_failed_grading_leaves_no_display_name_lookup_behind(self, auth_client: TestClient):
+        from unittest.mock import AsyncMock
+
+        sid = _create_session("fizzbuzz")
+        lookup = AsyncMock(return_value="name")
+        with patch("database.get_username_by_auth0_id", lookup), \
+                patch("main.compute_function_composite_score", side_effect=RuntimeError("boom")), \
+                patch("main.compute_composite_score", side_effect=RuntimeError("boom")):
+            resp = auth_client.post(f"/api/scoring-sessions/{sid}/submit", json={})
+
+        assert resp.status_code == 500
+        lookup.assert_not_called()
+
+
 # =========================================================================
 # Expiration — endpoints must return 410
 # =========================================================================
@@ -282,13 +304,15 @@ class TestExpiredSession:
         assert resp.status_code != 410
 
     def test_cleanup_only_removes_expired(self):
-        s1 = scoring_sessions.create_scoring_session("fizzbuzz", "user1")
-        s2 = scoring_sessions.create_scoring_session("fizzbuzz", "user2")
+        # Expiry is scheduled when a session is created, so create the
+        # expired ones in the past rather than backdating them afterwards.
+        now = time.time()
+        with patch("time.time", return_value=now - scoring_sessions.SESSION_TTL_SECONDS - 100):
+            s1 = scoring_sessions.create_scoring_session("fizzbuzz", "user1")
+        with patch("time.time", return_value=now - scoring_sessions.SESSION_TTL_SECONDS - 1):
+            s2 = scoring_sessions.create_scoring_session("fizzbuzz", "user2")
         s3 = scoring_sessions.create_scoring_session("fizzbuzz", "user3")
 
-        _scoring_sessions[s1.id].started_at = time.time() - scoring_sessions.SESSION_TTL_SECONDS - 100
-        _scoring_sessions[s2.id].started_at = time.time() - scoring_sessions.SESSION_TTL_SECONDS - 1
-
         removed = scoring_sessions.cleanup_expired_sessions()
 
         assert removed == 2
@@ -296,6 +320,16 @@ class TestExpiredSession:
         assert s2.id not in _scoring_sessions
         assert s3.id in _scoring_sessions
 
+    def test_cleanup_skips_removed_and_not_yet_due_sessions(self):
+        s1 = scoring_sessions.create_scoring_session("fizzbuzz", "user1")
+        scoring_sessions.delete_scoring_session(s1.id)
+        s2 = scoring_sessions.create_scoring_session("fizzbuzz", "user2")
+
+        assert scoring_sessions.cleanup_expired_sessions() == 0
+        with patch("time.time", return_value=time.time() + scoring_sessions.SESSION_TTL_SECONDS + 1):
+            assert scoring_sessions.cleanup_expired_sessions() == 1
+        assert s2.id not in _scoring_sessions
+
 
 # =========================================================================
 # Adversarial / abuse scenarios
@@ -467,3 +501,47 @@ class TestAdversarial:
             },
         )
         assert resp.status_code == 410
+
+
+# =========================================================================
+# UI submit — accuracy always comes from submit's own judge call
+# =========================================================================
+
+
+class TestUISubmit:
+
+    def test_evaluate_ui_scores_are_never_reused_by_submit(self, auth_client: TestClient):
+        from unittest.mock import AsyncMock, MagicMock
+
+        from evaluation import compute_composite_score
+        from main import _read_reference_html
+
+        sid = _create_session("build-landing-page")
+        snake_html, _ = _read_reference_html("backend/challenge_code/snake-game.html")
+        evaluated = auth_client.post("/api/evaluate-ui", json={
+            "challenge_id": "build-snake-game", "generated_html": snake_html, "scoring_session_id": sid,
+        })
+        assert evaluated.json()["score"] == 100.0
+
+        judge = MagicMock()
+        judge.generate = AsyncMock(return_value=MagicMock(response_text='{"score": 10, "reasoning": "different"}'))
+        with patch("main._create_judge_llm", return_value=judge):
+            resp = auth_client.post(f"/api/scoring-sessions/{sid}/submit", json={"generated_html": snake_html})
+
+        assert resp.status_code == 200
+        judge.generate.assert_awaited_once()
+        assert judge.generate.await_args.args[0].startswith("You are a generous and encouraging evaluator")
+        assert resp.json()["accuracy_score"] == compute_composite_score(0.10, 0, 0, 0)["accuracy_score"]
+
+
+class TestSessionConstruction:
+
+    def test_new_sessions_match_validated_model(self):
+        s1 = scoring_sessions.create_scoring_session("fizzbuzz", "user1", model="gpt-5.2")
+        s2 = scoring_sessions.create_scoring_session("fizzbuzz", "user2")
+        scoring_sessions.record_turn(
+            s1.id, input_tokens=1, output_tokens=2, cost=0.1, user_message="u", assistant_message="a",
+        )
+
+        assert s2.messages == []  # defaults are not shared between sessions
+        assert scoring_sessions.ScoringSession.model_validate(s1.model_dump()) == s1
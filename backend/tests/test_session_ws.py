@@ -0,0 +1,85 @@
+"""Tests for outbound streaming frames (session websocket sender, SSE chunks)."""
+
+import asyncio
+import json
+
+import pytest
+
+from starlette.websockets import WebSocketDisconnect
+
+from main import _ws_enqueue, _ws_sender
+from sse import sse_chunk_frame, sse_frame
+
+
+class _FakeWebSocket:
+    def __init__(self):
+        self.frames: list[dict] = []
+
+    async def send_text(self, text: str) -> None:
+        self.frames.append(json.loads(text))
+
+
+@pytest.mark.asyncio
+async def test_queued_stream_chunks_are_merged_in_order():
+    ws = _FakeWebSocket()
+    outbox: asyncio.Queue = asyncio.Queue()
+    for msg in (
+        {"type": "stream", "content": "a"},
+        {"type": "stream", "content": "b"},
+        {"type": "stream", "content": "c"},
+        {"type": "complete", "turn_number": 1},
+        {"type": "stream", "content": "d"},
+    ):
+        outbox.put_nowait(msg)
+
+    task = asyncio.create_task(_ws_sender(ws, outbox))
+    await asyncio.sleep(0)
+    task.cancel()
+
+    assert ws.frames == [
+        {"type": "stream", "content": "abc"},
+        {"type": "complete", "turn_number": 1},
+        {"type": "stream", "content": "d"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_sender_stops_quietly_when_client_disconnects():
+    class _Closed:
+        async def send_text(self, text: str) -> None:
+            raise RuntimeError('Cannot call "send" once a close message has been sent.')
+
+    outbox: asyncio.Queue = asyncio.Queue()
+    outbox.put_nowait({"type": "stream", "content": "x"})
+    await asyncio.wait_for(_ws_sender(_Closed(), outbox), timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_generation_stops_once_sender_is_gone():
+    release = asyncio.Event()
+
+    class _Stalled:
+        async def send_text(self, text: str) -> None:
+            await release.wait()
+            raise RuntimeError("client went away")
+
+    outbox: asyncio.Queue = asyncio.Queue(maxsize=1)
+    sender = asyncio.create_task(_ws_sender(_Stalled(), outbox))
+    await _ws_enqueue(outbox, sender, {"type": "stream", "content": "a"})
+    await asyncio.sleep(0)  # sender takes "a" and blocks sending it
+    await _ws_enqueue(outbox, sender, {"type": "stream", "content": "b"})
+
+    # Outbox full: the producer waits, then gives up when the sender dies.
+    blocked = asyncio.create_task(_ws_enqueue(outbox, sender, {"type": "stream", "content": "c"}))
+    await asyncio.sleep(0)
+    assert not blocked.done()
+    release.set()
+    with pytest.raises(WebSocketDisconnect):
+        await asyncio.wait_for(blocked, timeout=1)
+    with pytest.raises(WebSocketDisconnect):
+        await _ws_enqueue(outbox, sender, {"type": "stream", "content": "d"})
+
+
+def test_chunk_frame_matches_generic_encoding():
+    for chunk in ("plain", 'quote " and \\ backslash', "line\nbreak", "unicode ✓"):
+        assert sse_chunk_frame(chunk) == sse_frame({"type": "chunk", "content": chunk})
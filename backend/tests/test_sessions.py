@@ -0,0 +1,26 @@
+"""Tests for the in-memory session store."""
+
+from sessions import Turn, add_turn, create_session
+
+
+def test_history_tracks_added_turns():
+    session = create_session("fizzbuzz", "gpt-5.2")
+    assert session.history() == []
+
+    add_turn(session.id, Turn(turn_number=1, prompt_text="p1", response_text="r1"))
+    first = session.history()
+    assert first == [
+        {"role": "user", "content": "p1"},
+        {"role": "assistant", "content": "r1"},
+    ]
+
+    add_turn(session.id, Turn(turn_number=2, prompt_text="p2", response_text="r2"))
+    assert session.history() is first
+    assert [m["content"] for m in first] == ["p1", "r1", "p2", "r2"]
+
+
+def test_history_not_serialized():
+    session = create_session("fizzbuzz", "gpt-5.2")
+    add_turn(session.id, Turn(turn_number=1, prompt_text="p", response_text="r"))
+    session.history()
+    assert "_history" not in session.model_dump()